@@ -169,6 +169,116 @@ get_likely_products = dbc.Container(
                     sm=12, md=12, lg=9, xl=9
                 )
             ]
+        ),
+
+        html.Br(),
+
+        dbc.Row(
+            [
+                dbc.Col(
+                    [
+                        dbc.Card(
+                            [
+                                html.Label("Recommend Products", className="fs-5 fw-bold ps-3 pt-2 text-muted"),
+
+                                dbc.CardBody(
+                                    [
+                                        dbc.InputGroup(
+                                            [
+                                                dbc.InputGroupText("Products per Customer",
+                                                                   class_name="bg-primary",
+                                                                   style={"color": "#FFFFFF"}),
+                                                dbc.Input(
+                                                    id="n_recommended_products",
+                                                    type="number",
+                                                    min=1, max=20, step=1,
+                                                    value=3,
+                                                    persistence=True,
+                                                    persistence_type="memory",
+                                                ),
+                                            ],
+                                        ),
+
+                                        dbc.Tooltip(
+                                            """
+                                            Maximum number of products recommended to each customer.
+                                            """,
+                                            target="n_recommended_products",
+                                            placement="top",
+                                            delay={"hide": 100}
+                                        ),
+
+                                        html.Br(),
+
+                                        html.Label("Rank By"),
+
+                                        dbc.RadioItems(
+                                            id="recommend_rule_metric",
+                                            options=[
+                                                {"label": "Lift", "value": "lift"},
+                                                {"label": "Confidence", "value": "confidence"},
+                                            ],
+                                            value="lift",
+                                            input_class_name="dash-control-bc",
+                                            persistence=True,
+                                            persistence_type="memory",
+                                        ),
+
+                                        dbc.Tooltip(
+                                            """
+                                            The rule metric used to rank the products a customer has not purchased,
+                                            from all rules whose antecedents the customer purchased.
+                                            """,
+                                            target="recommend_rule_metric",
+                                            placement="top",
+                                            delay={"hide": 100}
+                                        ),
+
+                                        html.Br(),
+
+                                        html.Div(
+                                            [
+                                                dbc.Button(
+                                                    id="create_recommended_products",
+                                                    children="Recommend",
+                                                    n_clicks=0,
+                                                    size="lg",
+                                                    color="success",
+                                                    class_name="me-1",
+                                                ),
+                                            ],
+                                            className="d-grid gap-2",
+                                        )
+                                    ]
+                                )
+                            ],
+                            class_name="border-secondary"
+                        )
+                    ],
+                    sm=12, md=12, lg=3, xl=3,
+                    class_name="text-start"
+                ),
+
+                dbc.Col(
+                    [
+                        dbc.Card(
+                            [
+                                dbc.CardBody(
+                                    [
+                                        dcc.Loading(
+                                            html.Div(id="recommended_products_output"),
+                                            id="recommended_products_spinner",
+                                            color=comp_fun.spinner_color,
+                                        ),
+                                    ]
+                                )
+                            ],
+                            class_name="border-secondary"
+                        ),
+                    ],
+                    sm=12, md=12, lg=9, xl=9
+                )
+            ]
         )
     ],
     fluid=True
@@ -0,0 +1,209 @@
+"""
+Headless batch scoring of every customer with a saved rule set, e.g. for a nightly campaign run.
+
+The transactions are split into partitions of whole customers, each scored by a process pool with
+`function.recommend_products`. The recommendations are written in customer order one partition at a time, as CSV
+chunks or as a Parquet row group per partition, so only a few partitions are held in memory. The Dash app is not
+started.
+
+A saved rule set is a rule table serialized by `to_json` with orient 'split', as downloaded with the 'Rule Set' button
+of the Market Basket Analysis table (GET /api/rule-sets/<key>.json), or the rules are mined from the transactions
+with --min-support.
+
+    python batch_score.py demo_trans.csv recommendations.parquet --rules rules.json --workers 4 --k 5
+    python batch_score.py demo_trans.csv recommendations.csv --min-support 0.001
+"""
+import argparse
+import os
+import time
+import warnings
+from collections import deque
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+import function as mba_fun
+
+# The rules compiled once by each worker process in `init_worker`.
+worker_rules = None
+
+
+def read_transactions(path: str, taxonomy_threshold: int = None):
+    """
+    parameter
+    ---------
+    path: A CSV or Parquet transaction file.
+    taxonomy_threshold: When supplied, products are lumped into their taxonomy with `function.lump_product_data`.
+
+    return
+    ------
+    A pandas dataframe of the transactions.
+    """
+    if path.endswith((".parquet", ".pq")):
+        trans_tbl = pd.read_parquet(path)
+    else:
+        trans_tbl = pd.read_csv(path)
+        trans_tbl = trans_tbl.drop(columns=[c for c in trans_tbl.columns if c.startswith("Unnamed:")])
+
+    if taxonomy_threshold is not None:
+        trans_tbl = mba_fun.lump_product_data(df=trans_tbl, threshold=taxonomy_threshold)
+
+    return trans_tbl
+
+
+def read_rules(path: str):
+    """
+    A rule table serialized by `to_json` with orient 'split', as downloaded from the app, with antecedents and
+    consequents as frozensets.
+    """
+    with open(path) as rule_file:
+        return mba_fun.freeze_set(pd.read_json(rule_file, orient="split"))
+
+
+def customer_partitions(df: pd.DataFrame, partition_size: int):
+    """
+    parameter
+    ---------
+    df: product data.
+    partition_size: The number of customers in a partition.
+
+    return
+    ------
+    A generator of the transactions of `partition_size` customers at a time, in customer order.
+    """
+    customer_codes = pd.factorize(df["Customer_ID"], sort=True)[0]
+
+    order = np.argsort(customer_codes, kind="stable")
+    order = order[customer_codes[order] >= 0]
+
+    # The last bound is the end of the transactions, so the last partition keeps its remainder of customers ----------:
+    bounds = np.searchsorted(customer_codes[order], np.arange(0, customer_codes.max() + 1, partition_size))
+    bounds = np.append(bounds, len(order))
+
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        if stop > start:
+            yield df.iloc[order[start:stop]]
+
+
+def csv_writer(path: str):
+    header = True
+
+    def write(chunk: pd.DataFrame):
+        nonlocal header
+
+        chunk.to_csv(path, mode="w" if header else "a", header=header, index=False)
+        header = False
+
+    def close():
+        pass
+
+    return write, close
+
+
+def parquet_writer(path: str):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("writing Parquet requires pyarrow, install it with `pip install pyarrow` or write a CSV file.")
+
+    writer = None
+    empty = None
+
+    def write(chunk: pd.DataFrame):
+        nonlocal writer, empty
+
+        # Partitions without recommendations have no column types, keep one in case every partition is empty ---------:
+        if chunk.shape[0] == 0:
+            empty = chunk
+            return
+
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+
+        if writer is None:
+            writer = pq.ParquetWriter(path, table.schema)
+
+        writer.write_table(table)
+
+    def close():
+        if writer is not None:
+            writer.close()
+        elif empty is not None:
+            pq.write_table(pa.Table.from_pandas(empty, preserve_index=False), path)
+
+    return write, close
+
+
+def init_worker(rules: pd.DataFrame, metric: str):
+    global worker_rules
+
+    warnings.filterwarnings("ignore")
+    worker_rules = mba_fun.compile_recommend_rules(rules=rules, metric=metric)
+
+
+def score_partition(df: pd.DataFrame, k: int):
+    return mba_fun.recommend_products(df=df, k=k, recommend_rules=worker_rules)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score every customer with a saved rule set.")
+    parser.add_argument("transactions", help="CSV or Parquet transaction file.")
+    parser.add_argument("output", help="CSV or Parquet file of the recommendations.")
+
+    rule_source = parser.add_mutually_exclusive_group(required=True)
+    rule_source.add_argument("--rules", help="Rule set saved by `to_json` with orient 'split'.")
+    rule_source.add_argument("--min-support", type=float, help="Mine the rules from the transactions instead.")
+
+    parser.add_argument("--format", default=None, choices=["csv", "parquet"],
+                        help="Output format, taken from the output file extension when not supplied.")
+    parser.add_argument("--taxonomy-threshold", type=int, default=None,
+                        help="Lump products into their taxonomy, as the rules were mined on, e.g. 60.")
+    parser.add_argument("--k", type=int, default=5, help="Number of products recommended to each customer.")
+    parser.add_argument("--metric", default="lift", choices=["lift", "confidence"])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--partition-size", type=int, default=50_000, help="Number of customers in a partition.")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+    start = time.perf_counter()
+
+    output_format = args.format or ("parquet" if args.output.endswith((".parquet", ".pq")) else "csv")
+    write, close = parquet_writer(args.output) if output_format == "parquet" else csv_writer(args.output)
+
+    trans_tbl = read_transactions(args.transactions, taxonomy_threshold=args.taxonomy_threshold)
+
+    if args.rules:
+        rules = read_rules(args.rules)
+    else:
+        rules = mba_fun.create_association_rule(df=trans_tbl, min_support=args.min_support, rule_metric="lift",
+                                                min_threshold=0.5)
+
+    print(f"{trans_tbl.shape[0]:,} transactions, {rules.shape[0]:,} rules")
+
+    n_partitions, n_rows = 0, 0
+    pending = deque()
+
+    # Keep a few partitions in flight and write them in order as they complete ----------------------------------------:
+    with Pool(args.workers, initializer=init_worker, initargs=(rules, args.metric)) as pool:
+        for partition in customer_partitions(trans_tbl, args.partition_size):
+            pending.append(pool.apply_async(score_partition, (partition, args.k)))
+
+            while len(pending) > 2 * args.workers:
+                chunk = pending.popleft().get()
+                write(chunk)
+                n_partitions, n_rows = n_partitions + 1, n_rows + chunk.shape[0]
+
+        while pending:
+            chunk = pending.popleft().get()
+            write(chunk)
+            n_partitions, n_rows = n_partitions + 1, n_rows + chunk.shape[0]
+
+    close()
+
+    print(f"{n_rows:,} recommendations in {n_partitions:,} partitions written to {args.output} "
+          f"in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark of `function.recommend_products` across customer counts.
+
+Customers are created by resampling the baskets of the demo transactions, so the rules mined from the demo data
+match them as they match the demo customers.
+
+    python bench_recommend.py --customers 10000 100000 1000000 --k 5
+"""
+import argparse
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import function as mba_fun
+
+
+def resample_customers(df: pd.DataFrame, n_customers: int, seed: int = 0):
+    """
+    parameter
+    ---------
+    df: product data.
+    n_customers: The number of customers to create.
+    seed: The random seed.
+
+    return
+    ------
+    A pandas dataframe with the 'Customer_ID' and product variable of `n_customers` customers, each with the basket
+    of a random demo customer.
+    """
+    product = mba_fun.get_product_variable(df=df)
+
+    baskets = df[["Customer_ID", product]].drop_duplicates()
+    customer_codes, _ = pd.factorize(baskets["Customer_ID"])
+
+    order = np.argsort(customer_codes, kind="stable")
+    indptr = np.searchsorted(customer_codes[order], np.arange(customer_codes.max() + 2))
+
+    sampled = np.random.default_rng(seed).integers(0, len(indptr) - 1, n_customers)
+    n_rows = indptr[sampled + 1] - indptr[sampled]
+
+    rows = order[np.repeat(indptr[sampled], n_rows) + np.arange(n_rows.sum()) - np.repeat(np.cumsum(n_rows) - n_rows,
+                                                                                         n_rows)]
+
+    return pd.DataFrame({"Customer_ID": np.repeat(np.arange(n_customers), n_rows),
+                         product: baskets[product].to_numpy()[rows]})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark product recommendations across customer counts.")
+    parser.add_argument("--data", default="demo_trans.csv", help="Transaction data used to mine the rules.")
+    parser.add_argument("--customers", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--min-support", type=float, default=0.001)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--metric", default="lift", choices=["lift", "confidence"])
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+
+    trans_tbl = pd.read_csv(args.data)
+    rules = mba_fun.create_association_rule(df=trans_tbl, min_support=args.min_support, rule_metric="lift",
+                                            min_threshold=0.5)
+
+    print(f"{rules.shape[0]:,} rules")
+    print(f"{'customers':>12} {'transactions':>14} {'index (s)':>10} {'recommend (s)':>14} {'rows':>12}")
+
+    for n_customers in args.customers:
+        customer_tbl = resample_customers(df=trans_tbl, n_customers=n_customers)
+
+        start = time.perf_counter()
+        customer_items = mba_fun.create_customer_items(df=customer_tbl)
+        index_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        recommended = mba_fun.recommend_products(df=customer_tbl, rules=rules, k=args.k, metric=args.metric,
+                                                 customer_items=customer_items)
+        recommend_time = time.perf_counter() - start
+
+        print(f"{n_customers:>12,} {customer_tbl.shape[0]:>14,} {index_time:>10.2f} {recommend_time:>14.2f} "
+              f"{recommended.shape[0]:>12,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark of the app start, the time from starting a server process to its first responses.
+
+Each run starts a new Python process serving `mba_app.server` with werkzeug, as a gunicorn worker boot or a reload
+would, and times from the process start:
+
+- the first response to GET /
+- the first render of the home page and of the Market Basket Analysis page by `render_page_content`
+- the first callback loading the demo data, which imports pandas and the analysis functions
+
+    python bench_startup.py --runs 5
+"""
+import argparse
+import json
+import socket
+import subprocess
+import sys
+import time
+from http.client import HTTPConnection
+
+SERVE_SCRIPT = """
+import sys
+import warnings
+from werkzeug.serving import make_server
+
+warnings.filterwarnings("ignore")
+
+import mba_app
+
+make_server("127.0.0.1", int(sys.argv[1]), mba_app.server, threaded=True).serve_forever()
+"""
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def request(port: int, method: str, path: str, payload: dict = None):
+    connection = HTTPConnection("127.0.0.1", port, timeout=60)
+
+    try:
+        connection.request(method, path, body=None if payload is None else json.dumps(payload),
+                           headers={"Content-Type": "application/json"})
+        response = connection.getresponse()
+        response.read()
+
+        return response.status
+    finally:
+        connection.close()
+
+
+def callback_payload(output: str, inputs: list):
+    return {"output": output,
+            "outputs": {"id": output.split(".")[0], "property": output.split(".")[1]},
+            "inputs": [{"id": component, "property": prop, "value": value} for component, prop, value in inputs],
+            "changedPropIds": [f"{inputs[0][0]}.{inputs[0][1]}"],
+            "state": []}
+
+
+def run_startup(timeout: float):
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-c", SERVE_SCRIPT, str(port)], stdout=subprocess.DEVNULL,
+                              stderr=subprocess.DEVNULL)
+
+    try:
+        while True:
+            try:
+                if request(port, "GET", "/") == 200:
+                    break
+            except OSError:
+                if time.perf_counter() - start > timeout or server.poll() is not None:
+                    raise RuntimeError("the server did not start")
+
+                time.sleep(0.005)
+
+        timings = {"first response": time.perf_counter() - start}
+
+        for name, output, inputs in [
+            ("home page", "current_page.children", [("url", "pathname", "/")]),
+            ("mba page", "current_page.children", [("url", "pathname", "/mba")]),
+            ("demo data", "store_data.data", [("use_product", "n_clicks", 1), ("use_product_tax", "n_clicks", 0)]),
+        ]:
+            status = request(port, "POST", "/_dash-update-component", callback_payload(output, inputs))
+
+            if status != 200:
+                raise RuntimeError(f"the {name} callback failed with status {status}")
+
+            timings[name] = time.perf_counter() - start
+
+        return timings
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the time to the first responses of a new app process.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    runs = [run_startup(args.timeout) for _ in range(args.runs)]
+    names = list(runs[0].keys())
+
+    print(f"{'run':>6} " + " ".join(f"{name + ' (s)':>18}" for name in names))
+
+    for i, timings in enumerate(runs):
+        print(f"{i:>6} " + " ".join(f"{timings[name]:>18.3f}" for name in names))
+
+    print(f"{'median':>6} " + " ".join(f"{sorted(t[name] for t in runs)[len(runs) // 2]:>18.3f}" for name in names))
+
+
+if __name__ == "__main__":
+    main()
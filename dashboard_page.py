@@ -3,7 +3,6 @@ from dash import Input, Output, State, dcc, html, dash_table, ctx, ALL, MATCH
 import dash_bootstrap_components as dbc
 
 import ui_component as comp_fun
-import function as mba_fun
 
 dashboard_layout = html.Div(
     [
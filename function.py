@@ -1,9 +1,13 @@
-from pandas import DataFrame, concat
+from pandas import DataFrame, Index, factorize
+import numpy as np
 from numpy import nan
+from scipy.sparse import csc_matrix, csr_matrix
 from collections import Counter
+from itertools import chain, combinations
+from functools import reduce, lru_cache
+from heapq import merge
 import warnings
-from plotly.express import bar, scatter
-from mlxtend.frequent_patterns import apriori, association_rules
+from instrument import instrument
 
 from ui_component import seq_selected_color as seq_selected_color
 from ui_component import plot_bg_color as plot_bg_color
@@ -67,6 +71,34 @@ def create_data_info(df: DataFrame, info_type: str, round_val: int = 2):
     return f"{output:,}"
 
 
+@instrument()
+def create_data_summary(df: DataFrame, round_val: int = 2):
+    """
+    parameter
+    ---------
+    df:        Transaction dataframe.
+    round_val: Round output value.
+
+    return
+    ------
+    A dictionary with every `create_data_info` info_type and its formatted value, computed in one pass.
+    """
+
+    # The values are computed as `create_data_info` computes them -----------------------------------------------------|
+    summary = {
+        "no_transaction": df.shape[0],
+        "no_unique_customers": df["Customer_ID"].nunique(),
+        "total_sales": df["Sales_Amount"].sum(),
+        "average_sales": df["Sales_Amount"].mean(),
+        "unique_products": df["Product_Taxonomy" if "Unique_Product" in df.columns else "Product"].nunique(),
+    }
+
+    if round_val is not None:
+        summary = {info_type: round(value, round_val) for info_type, value in summary.items()}
+
+    return {info_type: f"{value:,}" for info_type, value in summary.items()}
+
+
 def get_product_variable(df: DataFrame):
     if "Product_Taxonomy" in df.columns.to_list():
         return "Product_Taxonomy"
@@ -74,12 +106,84 @@ def get_product_variable(df: DataFrame):
         return "Product"
 
 
+def top_n_rows(df: DataFrame, column: str, n: int, ascending: bool = False):
+    """
+    parameter
+    ---------
+    df: A dataframe.
+    column: The variable to order `df` by.
+    n: The number of rows to return.
+    ascending: If True the n smallest values are returned else the n largest.
+
+    return
+    ------
+    The first n rows of `df` ordered by `column`, only those n rows are sorted.
+    """
+
+    keys = df[column].to_numpy(dtype="float64")
+    keys = keys if ascending else -keys
+
+    n = max(0, min(n, keys.shape[0]))
+
+    if n == 0:
+        return df.iloc[0:0]
+
+    selected = np.argpartition(keys, n - 1)[:n] if n < keys.shape[0] else np.arange(n)
+    selected = selected[np.argsort(keys[selected], kind="stable")]
+
+    return df.iloc[selected]
+
+
+def page_rows(df: DataFrame, column: str, page_current: int, page_size: int, ascending: bool = False):
+    """
+    parameter
+    ---------
+    df: A dataframe.
+    column: The variable to order `df` by.
+    page_current: The page to return, starting from 0.
+    page_size: The number of rows in a page.
+    ascending: The direction of the ordering.
+
+    return
+    ------
+    The rows of `df` on the requested page, without sorting the rows after that page.
+    """
+
+    return top_n_rows(df, column, (page_current + 1) * page_size, ascending=ascending).iloc[page_current * page_size:]
+
+
+@instrument()
+def create_product_cube(df: DataFrame):
+    """
+    parameter
+    ---------
+    df: Transaction dataframe.
+
+    return
+    ------
+    A pandas dataframe indexed by product with the number of transactions ('Count') and the sum, mean, median,
+    min and max of 'Sales_Amount' and 'Quantity' (e.g 'Sales_Amount_sum', 'Quantity_mean').
+    """
+
+    product = get_product_variable(df)
+
+    agg_functions = ["sum", "mean", "median", "min", "max"]
+
+    cube_variables = {"Count": ("Sales_Amount", "size")}
+    for variable in ["Sales_Amount", "Quantity"]:
+        for agg_function in agg_functions:
+            cube_variables[f"{variable}_{agg_function}"] = (variable, agg_function)
+
+    return df.groupby(product).agg(**cube_variables)
+
+
 def most_purchased_products(df: DataFrame, output_type: str = None,
                             max_unique_value: int = 10,
                             seq_color: list = seq_selected_color,
                             bg_color: str = plot_bg_color,
                             font_color: str = ft_color,
-                            grid_color: str = g_color):
+                            grid_color: str = g_color,
+                            cube: DataFrame = None):
     """
     parameter
     ---------
@@ -88,27 +192,29 @@ def most_purchased_products(df: DataFrame, output_type: str = None,
     max_unique_value: The number of unique product values to display.
     p_color: Bar color.
     grid_color: color of the x-axis grid line.
+    cube: A precomputed `create_product_cube` of `df`, it is created when not supplied.
 
     value
     -----
-    A pandas dataframe or a plotly.graph_objects.Figure.
+    A pandas dataframe in product order, the server table sorts it a page at a time, or a
+    plotly.graph_objects.Figure.
     """
+
+    from plotly.express import bar
+
     match_arg(output_type, ["plot", "table"])
 
-    product = get_product_variable(df)
+    if cube is None:
+        cube = create_product_cube(df)
 
-    f_tbl = (
-        df[product]
-            .value_counts()
-            .reset_index()
-            .rename(columns={"index": product, product: "Count"})
-            .sort_values("Count", ascending=False)
-    )
+    product = cube.index.name
+
+    f_tbl = cube["Count"].reset_index()
 
     f_tbl["Proportion"] = round(f_tbl["Count"] / f_tbl["Count"].sum() * 100, 3)
 
     if output_type == "plot":
-        f_ptbl = f_tbl.sort_values("Count", ascending=True).tail(max_unique_value)
+        f_ptbl = top_n_rows(f_tbl, "Count", max_unique_value).iloc[::-1]
 
         f_fig = bar(
             data_frame=f_ptbl,
@@ -142,7 +248,8 @@ def most_profitable_product(df: DataFrame,
                             seq_color: list = seq_selected_color,
                             bg_color: str = plot_bg_color,
                             font_color: str = ft_color,
-                            grid_color: str = g_color):
+                            grid_color: str = g_color,
+                            cube: DataFrame = None):
     """
     parameter
     ---------
@@ -154,34 +261,34 @@ def most_profitable_product(df: DataFrame,
     bg_color: plot background color.
     font_color: plot font color.
     grid_color: color of the x-axis grid line.
+    cube: A precomputed `create_product_cube` of `df`, it is created when not supplied.
 
     value
     -----
-    A pandas dataframe or a plotly.graph_objects.Figure.
+    A pandas dataframe in product order, the server table sorts it a page at a time, or a
+    plotly.graph_objects.Figure.
     """
 
+    from plotly.express import bar
+
     match_arg(output_type, ["plot", "table"])
     match_arg(agg_function, ["sum", "mean", "median", "min", "max"])
 
-    product = get_product_variable(df)
+    if cube is None:
+        cube = create_product_cube(df)
+
+    product = cube.index.name
 
     agg_fun_name = {"sum": "Total", "mean": "Average", "median": "Median", "min": "Minimum", "max": "Maximum"}
 
     summary_variable = f"{agg_fun_name[agg_function]}_Sales_Amount"
 
-    f_tbl = (
-        df
-            .groupby(product)["Sales_Amount"]
-            .agg(agg_function)
-            .reset_index()
-            .rename(columns={"Sales_Amount": summary_variable})
-            .sort_values(summary_variable, ascending=False)
-    )
+    f_tbl = cube[f"Sales_Amount_{agg_function}"].rename(summary_variable).reset_index()
 
     f_tbl["Proportion"] = round(f_tbl[summary_variable] / f_tbl[summary_variable].sum() * 100, 3)
 
     if output_type == "plot":
-        f_ptbl = f_tbl.sort_values(summary_variable, ascending=True).tail(max_unique_value)
+        f_ptbl = top_n_rows(f_tbl, summary_variable, max_unique_value).iloc[::-1]
         summary_label = str.replace(summary_variable, "_", " ")
 
         f_fig = bar(
@@ -215,7 +322,8 @@ def product_quantity(df: DataFrame,
                      seq_color: list = seq_selected_color,
                      bg_color: str = plot_bg_color,
                      font_color: str = ft_color,
-                     grid_color: str = g_color):
+                     grid_color: str = g_color,
+                     cube: DataFrame = None):
     """
     parameter
     ---------
@@ -227,34 +335,34 @@ def product_quantity(df: DataFrame,
     bg_color: plot background color.
     font_color: plot font color.
     grid_color: color of the x-axis grid line.
+    cube: A precomputed `create_product_cube` of `df`, it is created when not supplied.
 
     value
     -----
-    A pandas dataframe or a plotly.graph_objects.Figure.
+    A pandas dataframe in product order, the server table sorts it a page at a time, or a
+    plotly.graph_objects.Figure.
     """
 
+    from plotly.express import bar
+
     match_arg(output_type, ["plot", "table"])
     match_arg(agg_function, ["sum", "mean", "median", "min", "max"])
 
-    product = get_product_variable(df)
+    if cube is None:
+        cube = create_product_cube(df)
+
+    product = cube.index.name
 
     agg_fun_name = {"sum": "Total", "mean": "Average", "median": "Median", "min": "Minimum", "max": "Maximum"}
 
     summary_variable = f"{agg_fun_name[agg_function]}_Quantity"
 
-    f_tbl = (
-        df
-            .groupby(product)[["Quantity"]]
-            .agg(agg_function)
-            .reset_index()
-            .sort_values(by="Quantity", ascending=False)
-            .rename(columns={"Quantity": summary_variable})
-    )
+    f_tbl = cube[f"Quantity_{agg_function}"].rename(summary_variable).reset_index()
 
     f_tbl["Proportion"] = round(f_tbl[summary_variable] / f_tbl[summary_variable].sum() * 100, 3)
 
     if output_type == "plot":
-        f_ptbl = f_tbl.sort_values(summary_variable, ascending=True).tail(max_unique_value)
+        f_ptbl = top_n_rows(f_tbl, summary_variable, max_unique_value).iloc[::-1]
         quantity_summary = str.replace(summary_variable, "_", " ")
 
         f_fig = bar(
@@ -280,6 +388,7 @@ def product_quantity(df: DataFrame,
         return f_tbl
 
 
+@instrument()
 def create_association_rule(df: DataFrame,
                             min_support: float = 0.005,
                             max_length: int = None,
@@ -301,6 +410,8 @@ def create_association_rule(df: DataFrame,
     A pandas dataframe.
     """
 
+    from mlxtend.frequent_patterns import apriori, association_rules
+
     match_arg(rule_metric, ["support", "confidence", "lift", "leverage", "conviction"])
     match_arg(output_type, ["rules", "sup_len"])
 
@@ -346,13 +457,118 @@ def create_association_rule(df: DataFrame,
         return rules
 
 
+@instrument()
+def prune_redundant_rules(df: DataFrame):
+    """
+    parameter
+    ---------
+    df: Product association rule data, with antecedents and consequents as frozensets.
+
+    return
+    ------
+    A pandas dataframe without the redundant rules. A rule is redundant when a rule with the same consequents and a
+    subset of its antecedents has the same or a higher confidence and lift. The subsets of each antecedent are looked
+    up in a dictionary of the rules, so the cost grows with the number of rules.
+    """
+
+    rules = list(zip(df["antecedents"].values, df["consequents"].values, df["confidence"].values, df["lift"].values))
+    rule_metrics = {(ant, con): (conf, lift) for ant, con, conf, lift in rules}
+
+    def is_redundant(ant, con, conf, lift):
+        for n_product in range(1, len(ant)):
+            for sub_ant in combinations(ant, n_product):
+                sub_metrics = rule_metrics.get((frozenset(sub_ant), con))
+
+                if sub_metrics is not None and sub_metrics[0] >= conf and sub_metrics[1] >= lift:
+                    return True
+
+        return False
+
+    keep = np.fromiter((not is_redundant(*rule) for rule in rules), dtype=bool, count=len(rules))
+
+    return df.loc[keep].reset_index(drop=True)
+
+
+@instrument()
+def create_product_index(df: DataFrame):
+    """
+    parameter
+    ---------
+    df: Product association rule data with frozenset antecedents and consequents.
+
+    return
+    ------
+    A dictionary with the number of rules ('n_rules') and, for both 'antecedents' and 'consequents', the sorted
+    positions of the rules holding each item ('postings') and the number of items in each rule ('lengths').
+    """
+
+    product_index = {"n_rules": df.shape[0]}
+
+    for rule in ["antecedents", "consequents"]:
+        rule_sets = df[rule].values
+        lengths = np.fromiter((len(x) for x in rule_sets), dtype=np.int64, count=len(rule_sets))
+
+        rule_ids = np.repeat(np.arange(len(rule_sets)), lengths)
+        item_codes, items = factorize(np.array(list(chain.from_iterable(rule_sets)), dtype=object))
+
+        order = np.argsort(item_codes, kind="stable")
+        bounds = np.searchsorted(item_codes[order], np.arange(len(items) + 1))
+        rule_ids = rule_ids[order]
+
+        product_index[rule] = {
+            "postings": {item: rule_ids[bounds[code]:bounds[code + 1]] for code, item in enumerate(items)},
+            "lengths": lengths,
+        }
+
+    return product_index
+
+
+def match_product_index(product_index: dict, rule_type: str, products, how: str = "any"):
+    """
+    parameter
+    ---------
+    product_index: Output of `create_product_index`.
+    rule_type: Either 'antecedents' or 'consequents'.
+    products: [list|string] The product(s) to match.
+    how: "any" rules containing any of the products, "all" rules containing all the products or "equal" rules
+         with exactly the products.
+
+    return
+    ------
+    A sorted numpy array with the positions of the matching rules.
+    """
+
+    match_arg(rule_type, ["antecedents", "consequents"])
+    match_arg(how, ["any", "all", "equal"])
+
+    products = set(products) if isinstance(products, list) else {products}
+    postings = product_index[rule_type]["postings"]
+    empty = np.array([], dtype=np.int64)
+
+    rule_lists = [postings.get(prod, empty) for prod in products]
+
+    if len(rule_lists) == 0:
+        return empty
+
+    if how == "any":
+        return np.unique(np.concatenate(rule_lists))
+
+    rule_ids = reduce(lambda x, y: np.intersect1d(x, y, assume_unique=True), sorted(rule_lists, key=len))
+
+    if how == "equal":
+        rule_ids = rule_ids[product_index[rule_type]["lengths"][rule_ids] == len(products)]
+
+    return rule_ids
+
+
 def filter_products_contain(df: DataFrame,
                             search_type: str = "any",
                             f_rule_type: str = None,
                             f_product_type: str = None,
                             s_rule_type: str = None,
                             s_product_type: str = None,
-                            bitwise_opt: str = None):
+                            bitwise_opt: str = None,
+                            product_index: dict = None):
     """
     parameter
     ---------
@@ -362,12 +578,56 @@ def filter_products_contain(df: DataFrame,
     f_rule_type,s_rule_type: Either 'antecedents' or 'consequents'.
     f_product_type,s_product_type [list|string] The type of product(s) to search for.
     bitwise_opt: A bitwise operator. Either '|' or '&'.
+    product_index: A precomputed `create_product_index` of `df`, it is created when not supplied.
 
     return
     ------
     A filtered pandas dataframe with only selected products by the type of rule.
     """
 
+    empty_tbl = DataFrame(
+        columns=["Antecedents", "Consequents",
+                 "Antecedent Support", "Consequent Support",
+                 "Support", "Confidence", "Lift", "Leverage", "Conviction"],
+        index=[0]
+    )
+
+    if product_index is None:
+        product_index = create_product_index(df)
+
+    rule_ids = products_contain_ids(product_index=product_index,
+                                    search_type=search_type,
+                                    f_rule_type=f_rule_type,
+                                    f_product_type=f_product_type,
+                                    s_rule_type=s_rule_type,
+                                    s_product_type=s_product_type,
+                                    bitwise_opt=bitwise_opt)
+
+    if rule_ids is None:
+        return empty_tbl
+
+    return df.iloc[rule_ids]
+
+
+def products_contain_ids(product_index: dict,
+                         search_type: str = "any",
+                         f_rule_type: str = None,
+                         f_product_type: str = None,
+                         s_rule_type: str = None,
+                         s_product_type: str = None,
+                         bitwise_opt: str = None):
+    """
+    parameter
+    ---------
+    product_index: Output of `create_product_index`.
+    search_type, f_rule_type, f_product_type, s_rule_type, s_product_type, bitwise_opt: See `filter_products_contain`.
+
+    return
+    ------
+    A sorted numpy array with the positions of the rules that contain the products or None when the second search
+    is incomplete.
+    """
+
     if (s_rule_type is None or s_product_type is None) and bitwise_opt is not None:
         bitwise_opt = None
 
@@ -377,76 +637,70 @@ def filter_products_contain(df: DataFrame,
     if s_product_type is not None and (s_rule_type is None or bitwise_opt is None):
         s_product_type = None
 
-    empty_tbl = DataFrame(
-        columns=["Antecedents", "Consequents",
-                 "Antecedent Support", "Consequent Support",
-                 "Support", "Confidence", "Lift", "Leverage", "Conviction"],
-        index=[0]
-    )
+    match_arg(search_type, ["any", "all"])
 
-    if search_type == "any":
-        def valid_products(product_type):
-            if isinstance(product_type, list):
-                return "|".join(product_type)
-            else:
-                return "|".join([product_type])
+    how = "any" if search_type == "any" else "equal"
 
-        f_selected_product_types = valid_products(f_product_type)
+    if s_rule_type is None and s_product_type is None and bitwise_opt is None:
+        return match_product_index(product_index, f_rule_type, f_product_type, how=how)
 
-        if s_rule_type is None and s_product_type is None and bitwise_opt is None:
-            return df.loc[df[f_rule_type].astype("str").str.contains(f_selected_product_types)]
+    elif s_rule_type is not None and s_product_type is not None and bitwise_opt is not None:
+        match_arg(bitwise_opt, ["&", "|"])
 
-        elif s_rule_type is not None and s_product_type is not None and bitwise_opt is not None:
-            match_arg(bitwise_opt, ["&", "|"])
+        f_match = match_product_index(product_index, f_rule_type, f_product_type, how=how)
+        s_match = match_product_index(product_index, s_rule_type, s_product_type, how=how)
 
-            s_selected_product_types = valid_products(s_product_type)
+        if bitwise_opt == "|":
+            return np.union1d(f_match, s_match)
+        elif bitwise_opt == "&":
+            return np.intersect1d(f_match, s_match, assume_unique=True)
+    else:
+        return None
 
-            if bitwise_opt == "|":
-                return df.loc[(df[f_rule_type].astype("str").str.contains(f_selected_product_types)) |
-                              (df[s_rule_type].astype("str").str.contains(s_selected_product_types))]
-            elif bitwise_opt == "&":
-                return df.loc[(df[f_rule_type].astype("str").str.contains(f_selected_product_types)) &
-                              (df[s_rule_type].astype("str").str.contains(s_selected_product_types))]
-        else:
-            return empty_tbl
 
-    elif search_type == "all":
-        def set_products(product_type):
-            if not isinstance(product_type, list):
-                return [product_type]
-            else:
-                return product_type
+def rule_metric_column(metric: str):
+    """
+    parameter
+    ---------
+    metric: A metric name as used in the query inputs e.g 'lift', 'ant_support'.
+
+    return
+    ------
+    The name of the metric variable in the product association rule data.
+    """
+    return {"ant_support": "antecedent support", "con_support": "consequent support"}.get(metric, metric)
 
-        f_selected_product_types = set(set_products(f_product_type))
 
-        if s_rule_type is None and s_product_type is None and bitwise_opt is None:
-            return df.loc[df[f_rule_type] == frozenset(f_selected_product_types)]
+def rule_metric_ranges(df: DataFrame):
+    """
+    parameter
+    ---------
+    df: Product association rule data.
 
-        elif s_rule_type is not None and s_product_type is not None and bitwise_opt is not None:
-            match_arg(bitwise_opt, ["&", "|"])
+    return
+    ------
+    A dictionary with the [minimum, maximum] of each rule metric.
+    """
 
-            s_selected_product_types = set(set_products(s_product_type))
+    metrics = ["support", "confidence", "lift", "leverage", "conviction", "antecedent support", "consequent support"]
 
-            if bitwise_opt == "|":
-                return df.loc[(df[f_rule_type] == frozenset(f_selected_product_types)) |
-                              (df[s_rule_type] == frozenset(s_selected_product_types))]
-            elif bitwise_opt == "&":
-                return df.loc[(df[f_rule_type] == frozenset(f_selected_product_types)) &
-                              (df[s_rule_type] == frozenset(s_selected_product_types))]
-        else:
-            return empty_tbl
+    return {metric: [df[metric].min(), df[metric].max()] for metric in metrics if metric in df.columns}
 
 
-def within_range_values(df: DataFrame, var_dict: dict):
+def within_range_values(df: DataFrame, var_dict: dict, metric_ranges: dict = None):
     """
     df: Product association rule data.
     var_dict: A dictionary with ... variables.
+    metric_ranges: A precomputed `rule_metric_ranges` of `df`.
     """
 
     valid_range = []
 
     for var in var_dict.keys():
-        valid_range.append(list(df[var].agg(["min", "max"]).values))
+        if metric_ranges is not None:
+            valid_range.append(metric_ranges[rule_metric_column(var)])
+        else:
+            valid_range.append(list(df[rule_metric_column(var)].agg(["min", "max"]).values))
 
     for key, value, index in zip(var_dict.keys(), var_dict.values(), range(len(var_dict))):
         if value < valid_range[index][0] or value > valid_range[index][1]:
@@ -607,164 +861,503 @@ def get_query_values(metric: list, metric_value: list, comp_op: list, bitw_op: l
         return [query_values, res_values[2], res_values[3]]
 
 
-def filter_rules_values(df: DataFrame, query_values: dict, comp_op: list, bitw_op: list):
+def comparison_function(comp_op: str):
     """
     parameter
     ---------
-    df Product association rule data.
-    query_values [dict] A dictionary with ... variable from `df` and their respective values.
-    comp_op [list[string]] A list of comparison operators with same length as the length of query_values.
-    bitw_op [list[string]] A list of bitwise operators with length(query_values)-1 .
+    comp_op: A comparison operator.
 
-    value
-    -----
-    A pandas dataframe with subset of the data `df` if condition is True.
+    return
+    ------
+    The numpy function of the comparison operator.
     """
 
-    if not isinstance(comp_op, list) or not isinstance(bitw_op, list):
-        raise TypeError("argument `comp_op` and `bitw_op` must be a list.")
-
-    if not isinstance(query_values, dict):
-        raise TypeError("argument `query_values` must be a dictionary with variable names and the values to filter.")
+    match_arg(comp_op, ["<", ">", ">=", "<=", "==", "!="])
 
-    if len(comp_op) != len(query_values):
-        raise ValueError("argument `comp_op` and `query_values` must be the same length.")
+    return {"<": np.less, ">": np.greater, ">=": np.greater_equal, "<=": np.less_equal,
+            "==": np.equal, "!=": np.not_equal}[comp_op]
 
-    if len(bitw_op) != len(query_values) - 1:
-        raise ValueError(f"argument `bitw_op` must have {len(query_values) - 1} values.")
 
-    within_range_values(df=df, var_dict=query_values)
+@lru_cache(maxsize=256)
+def compile_rule_query(metrics: tuple, comp_op: tuple, bitw_op: tuple):
+    """
+    parameter
+    ---------
+    metrics [tuple[string]] The metrics in the query.
+    comp_op [tuple[string]] A comparison operator for each metric.
+    bitw_op [tuple[string]] The bitwise operators between the metrics.
 
-    match_arg(comp_op, ["<", ">", ">=", "<=", "==", "!="])
-    match_arg(bitw_op, ["&", "|"])
+    value
+    -----
+    A query plan, a tuple of 'or' groups where each group is a tuple of (variable, comparison function, value
+    position) conditions that are combined with 'and'. '&' is evaluated before '|' as in `DataFrame.query`.
+    """
 
-    bitw_op = [''] + bitw_op
+    match_arg(list(bitw_op), ["&", "|"])
 
-    filter_queries = ""
+    plan = [[]]
 
-    for c_key, c_value, comp, bitw in zip(query_values.keys(), query_values.values(), comp_op, bitw_op):
-        filter_query = f"{bitw} ({c_key} {comp} {c_value})"
-        filter_queries = filter_queries + " " + filter_query
+    for position, (metric, comp) in enumerate(zip(metrics, comp_op)):
+        if position > 0 and bitw_op[position - 1] == "|":
+            plan.append([])
 
-    filter_queries = str.strip(filter_queries)
+        plan[-1].append((rule_metric_column(metric), comparison_function(comp), position))
 
-    return df.query(filter_queries)
+    return tuple(tuple(group) for group in plan)
 
 
-def filter_rules_length(df: DataFrame, rule_type: str, comp_op: str, length: int):
+def evaluate_rule_query(df: DataFrame, plan: tuple, values: list, rule_ids=None):
     """
     parameter
     ---------
     df: Product association rule data.
-    rule_type: The type of ...., can either 'antecedents' or 'consequents'.
-    comp_op: A comparison operators.
-    length: The amount of products.
+    plan: Output of `compile_rule_query`.
+    values: The value of each metric in the query.
+    rule_ids: The positions of the rules to evaluate, all rules when not supplied.
 
     value
     -----
-    A pandas dataframe with subset of the data `df` if condition is True.
+    A boolean numpy array with one value per evaluated rule.
     """
 
-    match_arg(comp_op, ["<", ">", ">=", "<=", "==", "!="])
+    n_rules = df.shape[0] if rule_ids is None else len(rule_ids)
 
-    f_tbl = df.copy()
+    mask = np.zeros(n_rules, dtype=bool)
 
-    rule_var_name = f"{rule_type}_len"
+    for group in plan:
+        group_mask = np.ones(n_rules, dtype=bool)
 
-    f_tbl[rule_var_name] = f_tbl[rule_type].apply(lambda x: len(x))
+        for column, comparison, position in group:
+            column_values = df[column].to_numpy()
 
-    filter_queries = f"{rule_var_name} {comp_op} {length}"
+            if rule_ids is not None:
+                column_values = column_values[rule_ids]
 
-    return f_tbl.query(filter_queries)
+            group_mask &= comparison(column_values, values[position])
 
+        mask |= group_mask
 
-def str_frozenset(df: DataFrame, df_type: str = "with_rules"):
+    return mask
+
+
+@instrument()
+def create_metric_index(df: DataFrame):
     """
     parameter
     ---------
-    df: product data.
-    df_type: How to convert forzenset to string. either 'with_rules' or 'sup_len'
+    df: Product association rule data.
 
     return
     ------
-    A pandas data with each value in antecedents and consequents as a string.
+    A dictionary with, for each rule metric, the metric value of each rule ('by_rule'), the rule positions ordered
+    by the metric ('order'), the ordered metric values ('values') and the number of values that are not missing
+    ('n_valid').
     """
-    f_tbl = df.copy()
 
-    if df_type == "with_rules":
-        for rule in ["antecedents", "consequents"]:
-            f_tbl[rule] = f_tbl[rule].apply(lambda x: f"({', '.join(x)})")
+    metrics = ["support", "confidence", "lift", "leverage", "conviction", "antecedent support", "consequent support"]
 
-    elif df_type == "sup_len":
-        f_tbl["itemsets"] = f_tbl["itemsets"].apply(lambda x: f"({', '.join(x)})")
+    metric_index = {}
 
-    return f_tbl
+    for metric in [m for m in metrics if m in df.columns]:
+        values = df[metric].to_numpy(dtype="float64")
+        order = np.argsort(values, kind="stable")
 
+        metric_index[metric] = {
+            "by_rule": values,
+            "order": order,
+            "values": values[order],
+            "n_valid": int(np.count_nonzero(~np.isnan(values))),
+        }
 
-def freeze_set(df: DataFrame):
+    return metric_index
+
+
+def metric_index_range(metric_index: dict, column: str, comparison, value: float):
     """
     parameter
     ---------
-    df product data.
+    metric_index: Output of `create_metric_index`.
+    column: A metric variable in the product association rule data.
+    comparison: A comparison function returned by `comparison_function`.
+    value: The value compared with.
 
-    return
-    ------
-    A pandas data with each value in antecedents and consequents as a frozenset.
+    value
+    -----
+    The start and end position, in the sorted metric values, of the rules that meet the comparison or None for
+    comparisons that are not a single range ('!=').
     """
 
-    # def as_frozenset(x):
-    #     # out_x = x.strip("][").split(", ")
-    #     return frozenset(x)
-
-    f_tbl = df.copy()
+    sorted_values = metric_index[column]["values"]
+    n_valid = metric_index[column]["n_valid"]
 
-    for rule in ["antecedents", "consequents"]:
-        f_tbl[rule] = f_tbl[rule].apply(lambda x: frozenset(x))
+    left = int(np.searchsorted(sorted_values[:n_valid], value, side="left"))
+    right = int(np.searchsorted(sorted_values[:n_valid], value, side="right"))
 
-    return f_tbl
+    return {np.greater: (right, n_valid), np.greater_equal: (left, n_valid), np.less: (0, left),
+            np.less_equal: (0, right), np.equal: (left, right)}.get(comparison)
 
 
-def unfreez_set(df: DataFrame):
+def query_metric_index(metric_index: dict, plan: tuple, values: list):
     """
     parameter
     ---------
-    df product data.
+    metric_index: Output of `create_metric_index`.
+    plan: Output of `compile_rule_query`.
+    values: The value of each metric in the query.
 
-    return
-    ------
-    A pandas data with each value in antecedents and consequents as a list.
+    value
+    -----
+    A sorted numpy array with the positions of the rules that meet the query. Each 'and' group starts from the
+    rules within its narrowest range, found by binary search, and only those rules are checked for the remaining
+    conditions.
     """
-    f_tbl = df.copy()
-    for rule in ["antecedents", "consequents"]:
-        f_tbl[rule] = f_tbl[rule].apply(lambda x: list(x))
 
-    return f_tbl
+    rule_ids = []
 
+    for group in plan:
+        ranges = [(metric_index_range(metric_index, column, comparison, values[position]),
+                   column, comparison, position) for column, comparison, position in group]
+        ranges = sorted(ranges, key=lambda x: x[0][1] - x[0][0] if x[0] is not None else np.inf)
 
-def extract_product_rules(df: DataFrame, rule_type: str, rule_range: int = None, by_row: bool = False):
-    """
-    parameters
-    ----------
-    df: product data.
-    rule_type: The type of ...., can either 'antecedents' or 'consequents'.
-    rule_range: A number to use as the maximum range of rows.
-    by_row: Whether to extract products by row or by combining them.
+        (narrowest, column, comparison, position), others = ranges[0], ranges[1:]
 
-    return
-    ------
-    A string or a list of products.
-    """
+        if narrowest is not None:
+            candidates = metric_index[column]["order"][narrowest[0]:narrowest[1]]
+        else:
+            candidates = np.flatnonzero(comparison(metric_index[column]["by_rule"], values[position]))
 
-    n_row = df.shape[0]
+        for _, column, comparison, position in others:
+            candidates = candidates[comparison(metric_index[column]["by_rule"][candidates], values[position])]
 
-    if n_row > 0:
-        if rule_range is None:
-            selected_rule = df[rule_type][df.index[0]]
+        rule_ids.append(candidates)
 
-            if len(selected_rule) == 1:
-                out_product = selected_rule[0]
-            else:
-                out_product = selected_rule
+    return reduce(np.union1d, rule_ids) if len(rule_ids) > 1 else np.sort(rule_ids[0])
+
+
+def filter_rules_values(df: DataFrame, query_values: dict, comp_op: list, bitw_op: list, metric_ranges: dict = None,
+                        metric_index: dict = None):
+    """
+    parameter
+    ---------
+    df Product association rule data.
+    query_values [dict] A dictionary with ... variable from `df` and their respective values.
+    comp_op [list[string]] A list of comparison operators with same length as the length of query_values.
+    bitw_op [list[string]] A list of bitwise operators with length(query_values)-1 .
+    metric_ranges: A precomputed `rule_metric_ranges` of `df`, used to validate the query values.
+    metric_index: A precomputed `create_metric_index` of `df`. When supplied the query is answered from the sorted
+                  metrics instead of comparing every rule.
+
+    value
+    -----
+    A pandas dataframe with subset of the data `df` if condition is True.
+    """
+
+    plan, values = compile_metric_query(df=df, query_values=query_values, comp_op=comp_op, bitw_op=bitw_op,
+                                        metric_ranges=metric_ranges)
+
+    if metric_index is not None:
+        return df.iloc[query_metric_index(metric_index, plan, values)]
+
+    return df.loc[evaluate_rule_query(df, plan, values)]
+
+
+def compile_metric_query(df: DataFrame, query_values: dict, comp_op: list, bitw_op: list, metric_ranges: dict = None):
+    """
+    parameter
+    ---------
+    df, query_values, comp_op, bitw_op, metric_ranges: See `filter_rules_values`.
+
+    value
+    -----
+    The query plan of `compile_rule_query` and the value of each metric in the query, after the query is validated.
+    """
+
+    if not isinstance(comp_op, list) or not isinstance(bitw_op, list):
+        raise TypeError("argument `comp_op` and `bitw_op` must be a list.")
+
+    if not isinstance(query_values, dict):
+        raise TypeError("argument `query_values` must be a dictionary with variable names and the values to filter.")
+
+    if len(comp_op) != len(query_values):
+        raise ValueError("argument `comp_op` and `query_values` must be the same length.")
+
+    if len(bitw_op) != len(query_values) - 1:
+        raise ValueError(f"argument `bitw_op` must have {len(query_values) - 1} values.")
+
+    within_range_values(df=df, var_dict=query_values, metric_ranges=metric_ranges)
+
+    plan = compile_rule_query(tuple(query_values.keys()), tuple(comp_op), tuple(bitw_op))
+
+    return plan, list(query_values.values())
+
+
+@instrument()
+def create_rule_lengths(df: DataFrame):
+    """
+    parameter
+    ---------
+    df: Product association rule data.
+
+    return
+    ------
+    A dictionary with, for both 'antecedents' and 'consequents', the number of products in each rule as an int8
+    array ('lengths') and the number of rules with each number of products ('histogram').
+    """
+
+    rule_lengths = {}
+
+    for rule in ["antecedents", "consequents"]:
+        lengths = np.fromiter((len(x) for x in df[rule].values), dtype=np.int8, count=df.shape[0])
+
+        rule_lengths[rule] = {"lengths": lengths, "histogram": np.bincount(lengths, minlength=1)}
+
+    return rule_lengths
+
+
+def count_rules_length(rule_lengths: dict, rule_type: str, comp_op: str, length: int):
+    """
+    parameter
+    ---------
+    rule_lengths: Output of `create_rule_lengths`.
+    rule_type: Either 'antecedents' or 'consequents'.
+    comp_op: A comparison operators.
+    length: The amount of products.
+
+    value
+    -----
+    The number of rules `filter_rules_length` will return.
+    """
+
+    histogram = rule_lengths[rule_type]["histogram"]
+
+    return int(histogram[comparison_function(comp_op)(np.arange(histogram.shape[0]), length)].sum())
+
+
+def filter_rules_length(df: DataFrame, rule_type: str, comp_op: str, length: int, rule_lengths: dict = None):
+    """
+    parameter
+    ---------
+    df: Product association rule data.
+    rule_type: The type of ...., can either 'antecedents' or 'consequents'.
+    comp_op: A comparison operators.
+    length: The amount of products.
+    rule_lengths: A precomputed `create_rule_lengths` of `df`, it is created when not supplied.
+
+    value
+    -----
+    A pandas dataframe with subset of the data `df` if condition is True.
+    """
+
+    match_arg(rule_type, ["antecedents", "consequents"])
+
+    if rule_lengths is None:
+        rule_lengths = create_rule_lengths(df)
+
+    return df.loc[comparison_function(comp_op)(rule_lengths[rule_type]["lengths"], length)]
+
+
+def create_rule_query(products: dict = None, metrics: dict = None, length: dict = None):
+    """
+    parameter
+    ---------
+    products: The arguments of `filter_products_contain` e.g {'search_type': 'any', 'f_rule_type': 'antecedents',
+              'f_product_type': ['milk']}.
+    metrics: The 'query_values', 'comp_op' and 'bitw_op' arguments of `filter_rules_values`.
+    length: The 'rule_type', 'comp_op' and 'length' arguments of `filter_rules_length`.
+
+    value
+    -----
+    A rule query, a dictionary with the supplied clauses. A rule meets the query when it meets every clause.
+    """
+
+    rule_query = {name: clause for name, clause in [("products", products), ("metrics", metrics), ("length", length)]
+                  if clause is not None}
+
+    if len(rule_query) == 0:
+        raise ValueError("a rule query needs at least one of `products`, `metrics` or `length`.")
+
+    return rule_query
+
+
+def rule_query_ids(df: DataFrame,
+                   rule_query: dict,
+                   product_index: dict = None,
+                   metric_ranges: dict = None,
+                   metric_index: dict = None,
+                   rule_lengths: dict = None,
+                   rule_ids=None):
+    """
+    parameter
+    ---------
+    df: Product association rule data.
+    rule_query: Output of `create_rule_query`.
+    product_index, metric_ranges, metric_index, rule_lengths: The precomputed artifacts of `df`, those needed by the
+                                                              query are created when not supplied.
+    rule_ids: A sorted numpy array with the positions of the rules to search in, all rules when not supplied.
+
+    value
+    -----
+    A sorted numpy array with the positions of the rules that meet the query. The number of rules each clause
+    selects is estimated from the artifacts (the product postings, a binary search of the sorted metrics and the
+    length histogram), the most selective clause selects the candidate rules and the remaining clauses are
+    evaluated on the candidates only and combined into one mask.
+    """
+
+    n_rules = df.shape[0]
+    clauses = []
+
+    if "products" in rule_query:
+        if product_index is None:
+            product_index = create_product_index(df)
+
+        product_ids = products_contain_ids(product_index=product_index, **rule_query["products"])
+
+        if product_ids is None:
+            product_ids = np.array([], dtype=np.int64)
+
+        clauses.append((len(product_ids), "products", product_ids))
+
+    if "metrics" in rule_query:
+        if metric_index is None:
+            metric_index = create_metric_index(df)
+
+        plan, values = compile_metric_query(df=df, metric_ranges=metric_ranges, **rule_query["metrics"])
+
+        estimate = 0
+
+        for group in plan:
+            ranges = [metric_index_range(metric_index, column, comparison, values[position])
+                      for column, comparison, position in group]
+            estimate += min(n_rules if r is None else r[1] - r[0] for r in ranges)
+
+        clauses.append((min(estimate, n_rules), "metrics", (plan, values)))
+
+    if "length" in rule_query:
+        if rule_lengths is None:
+            rule_lengths = create_rule_lengths(df)
+
+        rule_type, comp_op, length = (rule_query["length"][k] for k in ["rule_type", "comp_op", "length"])
+
+        match_arg(rule_type, ["antecedents", "consequents"])
+
+        clauses.append((count_rules_length(rule_lengths, rule_type, comp_op, length), "length",
+                        (rule_lengths[rule_type]["lengths"], comparison_function(comp_op), length)))
+
+    clauses = sorted(clauses, key=lambda x: x[0])
+
+    if rule_ids is None:
+        (_, name, clause), clauses = clauses[0], clauses[1:]
+
+        if name == "products":
+            rule_ids = clause
+        elif name == "metrics":
+            rule_ids = query_metric_index(metric_index, *clause)
+        else:
+            rule_ids = np.flatnonzero(clause[1](clause[0], clause[2]))
+
+    mask = np.ones(len(rule_ids), dtype=bool)
+
+    for _, name, clause in clauses:
+        if name == "products":
+            mask &= np.isin(rule_ids, clause, assume_unique=True)
+        elif name == "metrics":
+            mask &= evaluate_rule_query(df, *clause, rule_ids=rule_ids)
+        else:
+            mask &= clause[1](clause[0][rule_ids], clause[2])
+
+    return rule_ids[mask]
+
+
+@instrument()
+def str_frozenset(df: DataFrame, df_type: str = "with_rules"):
+    """
+    parameter
+    ---------
+    df: product data.
+    df_type: How to convert forzenset to string. either 'with_rules' or 'sup_len'
+
+    return
+    ------
+    A pandas data with each value in antecedents and consequents as a string.
+    """
+    f_tbl = df.copy()
+
+    if df_type == "with_rules":
+        for rule in ["antecedents", "consequents"]:
+            f_tbl[rule] = f_tbl[rule].apply(lambda x: f"({', '.join(x)})")
+
+    elif df_type == "sup_len":
+        f_tbl["itemsets"] = f_tbl["itemsets"].apply(lambda x: f"({', '.join(x)})")
+
+    return f_tbl
+
+
+@instrument()
+def freeze_set(df: DataFrame):
+    """
+    parameter
+    ---------
+    df product data.
+
+    return
+    ------
+    A pandas data with each value in antecedents and consequents as a frozenset.
+    """
+
+    # def as_frozenset(x):
+    #     # out_x = x.strip("][").split(", ")
+    #     return frozenset(x)
+
+    f_tbl = df.copy()
+
+    for rule in ["antecedents", "consequents"]:
+        f_tbl[rule] = f_tbl[rule].apply(lambda x: frozenset(x))
+
+    return f_tbl
+
+
+@instrument()
+def unfreez_set(df: DataFrame):
+    """
+    parameter
+    ---------
+    df product data.
+
+    return
+    ------
+    A pandas data with each value in antecedents and consequents as a list.
+    """
+    f_tbl = df.copy()
+    for rule in ["antecedents", "consequents"]:
+        f_tbl[rule] = f_tbl[rule].apply(lambda x: list(x))
+
+    return f_tbl
+
+
+def extract_product_rules(df: DataFrame, rule_type: str, rule_range: int = None, by_row: bool = False):
+    """
+    parameters
+    ----------
+    df: product data.
+    rule_type: The type of ...., can either 'antecedents' or 'consequents'.
+    rule_range: A number to use as the maximum range of rows.
+    by_row: Whether to extract products by row or by combining them.
+
+    return
+    ------
+    A string or a list of products.
+    """
+
+    n_row = df.shape[0]
+
+    if n_row > 0:
+        if rule_range is None:
+            selected_rule = df[rule_type][df.index[0]]
+
+            if len(selected_rule) == 1:
+                out_product = selected_rule[0]
+            else:
+                out_product = selected_rule
 
             return out_product
         else:
@@ -794,19 +1387,596 @@ def extract_product_rules(df: DataFrame, rule_type: str, rule_range: int = None,
         return []
 
 
+def range_positions(starts, lengths):
+    """
+    parameter
+    ---------
+    starts: A numpy array with the start of each range.
+    lengths: A numpy array with the length of each range.
+
+    return
+    ------
+    A numpy array with the positions of all the ranges, one range after the other.
+    """
+
+    return np.repeat(starts, lengths) + np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+
+@instrument()
+def create_customer_items(df: DataFrame):
+    """
+    parameter
+    ---------
+    df: product data.
+
+    return
+    ------
+    A dictionary with a sparse customer by product matrix in CSC format ('matrix'), one if the customer purchased
+    the product, so each column holds the sorted row positions of the customers that purchased the product, the
+    customer id of each row ('customers'), the product of each column ('products'), the position
+    of the transactions ordered by customer ('row_order'), the start of each customer's transactions in 'row_order'
+    ('row_indptr') and the product column of each transaction ('row_products').
+    """
+
+    product = get_product_variable(df=df)
+
+    customer_codes, customers = factorize(df["Customer_ID"], sort=True)
+    product_codes, products = factorize(df[product], sort=True)
+
+    valid = (customer_codes >= 0) & (product_codes >= 0)
+    pairs = np.unique(customer_codes[valid].astype(np.int64) * len(products) + product_codes[valid])
+
+    matrix = csc_matrix((np.ones(len(pairs), dtype=np.int8), (pairs // len(products), pairs % len(products))),
+                        shape=(len(customers), len(products)))
+    matrix.sort_indices()
+
+    row_order = np.argsort(customer_codes, kind="stable")
+    row_indptr = np.searchsorted(customer_codes[row_order], np.arange(len(customers) + 1))
+
+    return {"matrix": matrix, "customers": customers, "products": products, "row_order": row_order,
+            "row_indptr": row_indptr, "row_products": product_codes}
+
+
+def customers_with_products(customer_items: dict, products):
+    """
+    parameter
+    ---------
+    customer_items: Output of `create_customer_items`.
+    products: [list|string] The product(s) a customer must have purchased.
+
+    return
+    ------
+    A sorted numpy array with the row positions of the customers that purchased all the products, the intersection
+    of the sorted customers of each product starting from the product with the fewest customers.
+    """
+
+    products = list(set([products] if isinstance(products, str) else products))
+    columns = customer_items["products"].get_indexer(products)
+
+    if len(columns) == 0 or (columns < 0).any():
+        return np.array([], dtype=np.int64)
+
+    indptr, indices = customer_items["matrix"].indptr, customer_items["matrix"].indices
+
+    postings = sorted([indices[indptr[c]:indptr[c + 1]] for c in columns], key=len)
+
+    return reduce(lambda x, y: np.intersect1d(x, y, assume_unique=True), postings[1:], postings[0])
+
+
+def customer_product_rows(customer_items: dict, customers, products):
+    """
+    parameter
+    ---------
+    customer_items: Output of `create_customer_items`.
+    customers: A numpy array with the row positions of customers.
+    products: [list|string] The product(s) of the transactions.
+
+    return
+    ------
+    A sorted numpy array with the positions of the transactions of `customers` with one of the products.
+    """
+
+    products = [products] if isinstance(products, str) else products
+    columns = customer_items["products"].get_indexer(products)
+
+    starts = customer_items["row_indptr"][customers]
+    rows = customer_items["row_order"][range_positions(starts, customer_items["row_indptr"][customers + 1] - starts)]
+
+    return np.sort(rows[np.isin(customer_items["row_products"][rows], columns[columns >= 0])])
+
+
+def create_rule_trie(antecedents: list):
+    """
+    parameter
+    ---------
+    antecedents: [list[list|frozenset|string]] The distinct antecedent product(s) of each rule.
+
+    return
+    ------
+    A dictionary with a trie of the antecedents over canonical item ids, the position of each product in the sorted
+    antecedent products ('items', 'item_ids'). Each antecedent is the path of its sorted item ids from the root node
+    0. The dictionary holds the children of each node by item id ('children'), the position in `antecedents` of the
+    antecedent ending at each node or -1 ('terminals') and the edges ordered by parent node and item id as
+    `parent * len(items) + item` ('edge_keys') with their child nodes ('edge_children').
+    """
+
+    antecedents = [[ant] if isinstance(ant, str) else ant for ant in antecedents]
+
+    items = np.array(sorted(set(chain.from_iterable(antecedents))), dtype=object)
+    item_ids = {product: i for i, product in enumerate(items)}
+
+    children = [{}]
+    terminals = [-1]
+
+    for position, ant in enumerate(antecedents):
+        node = 0
+
+        for item in sorted(set(item_ids[product] for product in ant)):
+            child = children[node].get(item)
+
+            if child is None:
+                child = len(children)
+                children[node][item] = child
+                children.append({})
+                terminals.append(-1)
+
+            node = child
+
+        terminals[node] = position
+
+    parents = np.repeat(np.arange(len(children)), [len(node_children) for node_children in children])
+    edge_items = np.fromiter(chain.from_iterable(children), dtype=np.int64, count=len(parents))
+    edge_children = np.fromiter(chain.from_iterable(c.values() for c in children), dtype=np.int64, count=len(parents))
+
+    edge_keys = parents * max(len(items), 1) + edge_items
+    order = np.argsort(edge_keys)
+
+    return {"items": items, "item_ids": item_ids, "children": children, "terminals": np.array(terminals),
+            "edge_keys": edge_keys[order], "edge_children": edge_children[order]}
+
+
+def match_rule_trie(rule_trie: dict, products):
+    """
+    parameter
+    ---------
+    rule_trie: Output of `create_rule_trie`.
+    products: [list|string] The product(s) in the basket.
+
+    return
+    ------
+    A list with the position of every antecedent whose products are all in the basket. Only the subsets of the
+    basket that are a path of the trie are visited, each by the fewest of its children and remaining basket items.
+    """
+
+    products = [products] if isinstance(products, str) else products
+
+    item_ids, children, terminals = rule_trie["item_ids"], rule_trie["children"], rule_trie["terminals"]
+
+    basket = sorted(set(item_ids[product] for product in products if product in item_ids))
+    positions = {item: i for i, item in enumerate(basket)}
+
+    matched = [terminals[0]] if terminals[0] >= 0 else []
+    stack = [(0, 0)]
+
+    while stack:
+        node, start = stack.pop()
+        node_children = children[node]
+
+        if len(node_children) < len(basket) - start:
+            steps = [(child, positions[item] + 1) for item, child in node_children.items()
+                     if positions.get(item, -1) >= start]
+        else:
+            steps = [(node_children[item], i + 1) for i, item in enumerate(basket[start:], start)
+                     if item in node_children]
+
+        for child, next_start in steps:
+            if terminals[child] >= 0:
+                matched.append(terminals[child])
+
+            if children[child] and next_start < len(basket):
+                stack.append((child, next_start))
+
+    return matched
+
+
+def customer_trie_items(customer_items: dict, rule_trie: dict):
+    """
+    parameter
+    ---------
+    customer_items: Output of `create_customer_items`.
+    rule_trie: Output of `create_rule_trie`.
+
+    return
+    ------
+    Two numpy arrays as used by `match_rule_trie_rows`, the start of each customer's items in the second array, and
+    the end of the last customer's, and the sorted trie item ids of the products each customer purchased that are in
+    an antecedent.
+    """
+
+    purchased = customer_items["matrix"].tocsr()
+    purchased.sort_indices()
+
+    # Both the columns and the trie items are sorted products, so the item ids stay sorted within each customer -------:
+    column_items = np.fromiter((rule_trie["item_ids"].get(product, -1) for product in customer_items["products"]),
+                               dtype=np.int64, count=len(customer_items["products"]))
+
+    items = column_items[purchased.indices]
+    valid = items >= 0
+
+    rows = np.repeat(np.arange(purchased.shape[0]), np.diff(purchased.indptr))
+    indptr = np.r_[0, np.cumsum(np.bincount(rows[valid], minlength=purchased.shape[0]))]
+
+    return indptr, items[valid]
+
+
+def match_rule_trie_rows(rule_trie: dict, indptr, items):
+    """
+    parameter
+    ---------
+    rule_trie: Output of `create_rule_trie`.
+    indptr: A numpy array with the start of each basket's items in `items`, and the end of the last basket.
+    items: A numpy array with the sorted trie item ids of each basket, one basket after the other.
+
+    return
+    ------
+    Two numpy arrays with, for every basket that holds all the products of an antecedent, the position of the basket
+    and the position of the antecedent. The trie is walked one level at a time for all baskets, extending each
+    matched path by the remaining items of its basket.
+    """
+
+    n_items = max(len(rule_trie["items"]), 1)
+    edge_keys, edge_children, terminals = rule_trie["edge_keys"], rule_trie["edge_children"], rule_trie["terminals"]
+    has_children = np.diff(np.searchsorted(edge_keys, np.arange(len(terminals) + 1) * n_items)) > 0
+
+    n_baskets = len(indptr) - 1
+
+    matched_rows = [np.arange(n_baskets)] if terminals[0] >= 0 else []
+    matched_ants = [np.full(n_baskets, terminals[0])] if terminals[0] >= 0 else []
+
+    rows, nodes, starts = np.arange(n_baskets), np.zeros(n_baskets, dtype=np.int64), np.asarray(indptr[:-1])
+
+    while len(rows) > 0 and len(edge_keys) > 0:
+        n_steps = indptr[rows + 1] - starts
+        positions = range_positions(starts, n_steps)
+        states = np.repeat(np.arange(len(rows)), n_steps)
+
+        keys = nodes[states] * n_items + items[positions]
+        edges = np.minimum(np.searchsorted(edge_keys, keys), len(edge_keys) - 1)
+        hit = edge_keys[edges] == keys
+
+        rows, nodes, starts = rows[states[hit]], edge_children[edges[hit]], positions[hit] + 1
+
+        terminal = terminals[nodes] >= 0
+        matched_rows.append(rows[terminal])
+        matched_ants.append(terminals[nodes[terminal]])
+
+        extend = has_children[nodes] & (starts < indptr[rows + 1])
+        rows, nodes, starts = rows[extend], nodes[extend], starts[extend]
+
+    if len(matched_rows) == 0:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+
+    return np.concatenate(matched_rows), np.concatenate(matched_ants)
+
+
+@instrument()
+def bulk_protential_customer_product(df: DataFrame,
+                                     ant_products: list,
+                                     con_products: list,
+                                     just_customer_id: bool = False,
+                                     customer_items: dict = None):
+    """
+    parameter
+    ---------
+    df product data.
+    ant_products [list[list|string]] The antecedent product(s) of each rule.
+    con_products [list[list|string]] The consequent product(s) of each rule.
+    just_customer_id: Whether to return just the customer id that meet all conditions.
+    customer_items: A precomputed `create_customer_items` of `df`, it is created when not supplied.
+
+    return
+    ------
+    A pandas dataframe with, for each rule, the antecedent product transactions of the customers that purchased all
+    the antecedent products and a new column of likely product the customer can purchase, or just the customer ids.
+    """
+
+    if customer_items is None:
+        customer_items = create_customer_items(df=df)
+
+    # Match the distinct antecedents with a trie and expand each match to the rules of the antecedent ----------------:
+    ant_keys = np.empty(len(ant_products), dtype=object)
+    ant_keys[:] = [frozenset([p]) if isinstance(p, str) else frozenset(p) for p in ant_products]
+    ant_codes, antecedents = factorize(ant_keys)
+
+    rule_trie = create_rule_trie(list(antecedents))
+    customers, ant_ids = match_rule_trie_rows(rule_trie, *customer_trie_items(customer_items, rule_trie))
+
+    ant_rules = np.argsort(ant_codes, kind="stable")
+    ant_indptr = np.searchsorted(ant_codes[ant_rules], np.arange(len(antecedents) + 1))
+    n_ant_rules = np.diff(ant_indptr)[ant_ids]
+
+    customers, rules = np.repeat(customers, n_ant_rules), ant_rules[range_positions(ant_indptr[ant_ids], n_ant_rules)]
+
+    order = np.lexsort((customers, rules))
+    customers, rules = customers[order], rules[order]
+
+    if just_customer_id:
+        return DataFrame({"Customer_ID": customer_items["customers"][customers]})
+
+    likely_purchase = np.array([", ".join(p) if isinstance(p, list) else p for p in con_products], dtype=object)
+
+    # Expand each (customer, rule) pair to the customer's transactions ------------------------------------------------:
+    starts = customer_items["row_indptr"][customers]
+    n_rows = customer_items["row_indptr"][customers + 1] - starts
+
+    pair_rules = np.repeat(rules, n_rows)
+    rows = customer_items["row_order"][range_positions(starts, n_rows)]
+
+    # Keep the transactions of the rule's antecedent products, matched on (product, rule) keys ------------------------:
+    n_rules = len(ant_keys)
+    ant_columns = customer_items["products"].get_indexer(list(chain.from_iterable(ant_keys))).astype(np.int64)
+    ant_pairs = ant_columns * n_rules + np.repeat(np.arange(n_rules), [len(p) for p in ant_keys])
+
+    is_antecedent = np.isin(customer_items["row_products"][rows].astype(np.int64) * n_rules + pair_rules,
+                            ant_pairs[ant_columns >= 0])
+
+    rows, pair_rules = rows[is_antecedent], pair_rules[is_antecedent]
+    order = np.lexsort((rows, pair_rules))
+
+    lpp_tbl = df.iloc[rows[order]].copy()
+    lpp_tbl["Likely_Product_Purchase"] = likely_purchase[pair_rules[order]]
+
+    return lpp_tbl
+
+
+@instrument()
+def compile_recommend_rules(rules: DataFrame, metric: str = "lift"):
+    """
+    parameter
+    ---------
+    rules: Product association rule data, with antecedents and consequents as frozensets.
+    metric: The rule metric used to rank the products. Either 'lift' or 'confidence'.
+
+    return
+    ------
+    A dictionary used by `recommend_products` with the metric ('metric'), the sorted consequent products
+    ('products'), the `create_rule_trie` of the distinct antecedents ('trie') and a sparse antecedent by consequent
+    product matrix in CSR format of the best `metric` of the rules of each pair ('ant_scores'). It does not depend on
+    the customers, so it can be compiled once and used for any number of customer partitions.
+    """
+
+    match_arg(metric, ["lift", "confidence"])
+
+    # The frozensets are read directly, `extract_product_rules` needs `unfreez_set` and joins single products to strings
+    con_items = list(chain.from_iterable(rules["consequents"].values))
+    products = Index(sorted(set(con_items)))
+
+    # Keep the best score of each antecedent and consequent product, rules share few distinct antecedents -------------:
+    ant_codes, antecedents = factorize(rules["antecedents"])
+
+    n_products = len(products)
+    con_lengths = rules["consequents"].map(len).to_numpy(dtype=np.int64)
+    con_scores = np.repeat(rules[metric].to_numpy(dtype="float64"), con_lengths)
+    ant_con = np.repeat(ant_codes.astype(np.int64), con_lengths) * n_products + products.get_indexer(con_items)
+
+    order = np.lexsort((-con_scores, ant_con))
+    ant_con, con_scores = ant_con[order], con_scores[order]
+    first = np.r_[True, ant_con[1:] != ant_con[:-1]][:len(ant_con)]
+
+    ant_scores = csr_matrix((con_scores[first], (ant_con[first] // n_products, ant_con[first] % n_products)),
+                            shape=(len(antecedents), n_products))
+    ant_scores.sort_indices()
+
+    return {"metric": metric, "products": products, "trie": create_rule_trie(list(antecedents)),
+            "ant_scores": ant_scores}
+
+
+@instrument()
+def recommend_products(df: DataFrame,
+                       rules: DataFrame = None,
+                       k: int = 5,
+                       metric: str = "lift",
+                       customer_items: dict = None,
+                       recommend_rules: dict = None):
+    """
+    parameter
+    ---------
+    df: product data.
+    rules: Product association rule data, with antecedents and consequents as frozensets.
+    k: The maximum number of products recommended to each customer.
+    metric: The rule metric used to rank the products. Either 'lift' or 'confidence'.
+    customer_items: A precomputed `create_customer_items` of `df`, it is created when not supplied.
+    recommend_rules: A precomputed `compile_recommend_rules`, used instead of `rules` and `metric` when supplied.
+
+    return
+    ------
+    A pandas dataframe with, for each customer, up to `k` consequent products the customer has not purchased from
+    the rules whose antecedents the customer purchased. Products are ranked by the best `metric` of those rules.
+    """
+
+    if k < 1:
+        raise ValueError("argument `k` must be 1 or greater.")
+
+    if recommend_rules is None:
+        recommend_rules = compile_recommend_rules(rules=rules, metric=metric)
+
+    if customer_items is None:
+        customer_items = create_customer_items(df=df)
+
+    columns = ["Customer_ID", "Rank", "Recommended_Product", str.title(recommend_rules["metric"])]
+
+    products, rule_trie = recommend_rules["products"], recommend_rules["trie"]
+    ant_scores = recommend_rules["ant_scores"]
+    n_products = len(products)
+
+    if n_products == 0:
+        return DataFrame(columns=columns)
+
+    trie_indptr, trie_items = customer_trie_items(customer_items, rule_trie)
+
+    purchased = customer_items["matrix"].tocsr()
+    purchased_columns = products.get_indexer(customer_items["products"])
+
+    # Score a block of customers by product at a time and select the top k of each row --------------------------------:
+    n_customers = purchased.shape[0]
+
+    block_size = max(1, 2 ** 20 // max(n_products, 1))
+    n_top = min(k, n_products)
+
+    top_customers, top_ranks, top_products, top_scores = [], [], [], []
+
+    for start in range(0, n_customers, block_size):
+        stop = min(start + block_size, n_customers)
+
+        customers, ant_ids = match_rule_trie_rows(rule_trie, trie_indptr[start:stop + 1] - trie_indptr[start],
+                                                  trie_items[trie_indptr[start]:trie_indptr[stop]])
+
+        if len(customers) == 0:
+            continue
+
+        n_con = np.diff(ant_scores.indptr)[ant_ids]
+        positions = range_positions(ant_scores.indptr[ant_ids], n_con)
+
+        best = np.full((stop - start) * n_products, -np.inf)
+        np.maximum.at(best, np.repeat(customers, n_con) * n_products + ant_scores.indices[positions],
+                      ant_scores.data[positions])
+
+        best = best.reshape(stop - start, n_products)
+
+        # Purchased products are not recommended ----------------------------------------------------------------------:
+        block = purchased[start:stop]
+        block_rows = np.repeat(np.arange(stop - start), np.diff(block.indptr))
+        block_columns = purchased_columns[block.indices]
+
+        best[block_rows[block_columns >= 0], block_columns[block_columns >= 0]] = -np.inf
+
+        top = np.argpartition(-best, n_top - 1, axis=1)[:, :n_top]
+        block_scores = np.take_along_axis(best, top, axis=1)
+
+        order = np.argsort(-block_scores, axis=1, kind="stable")
+        top, block_scores = np.take_along_axis(top, order, axis=1), np.take_along_axis(block_scores, order, axis=1)
+
+        rows, ranks = np.nonzero(np.isfinite(block_scores))
+
+        top_customers.append(rows + start)
+        top_ranks.append(ranks + 1)
+        top_products.append(top[rows, ranks])
+        top_scores.append(block_scores[rows, ranks])
+
+    if len(top_customers) == 0:
+        return DataFrame(columns=columns)
+
+    return DataFrame({
+        columns[0]: customer_items["customers"][np.concatenate(top_customers)],
+        columns[1]: np.concatenate(top_ranks),
+        columns[2]: products[np.concatenate(top_products)],
+        columns[3]: np.concatenate(top_scores),
+    })
+
+
+@instrument()
+def compile_basket_rules(rules: DataFrame):
+    """
+    parameter
+    ---------
+    rules: Product association rule data, with antecedents and consequents as frozensets.
+
+    return
+    ------
+    A dictionary used by `recommend_basket` with the distinct antecedents as sorted tuples ('antecedents'), their
+    `create_rule_trie` ('trie') and, for each antecedent and each of 'lift' and 'confidence', the (consequent product,
+    confidence, lift) of the best rule of each consequent product ordered by the metric ('rules').
+    """
+
+    compiled = {}
+
+    for ant, con, conf, lift in zip(rules["antecedents"].values, rules["consequents"].values,
+                                    rules["confidence"].values, rules["lift"].values):
+        compiled.setdefault(tuple(sorted(ant)), []).extend((product, float(conf), float(lift)) for product in con)
+
+    def best_rules(ant_rules, position):
+        best = {}
+
+        for rule in ant_rules:
+            if rule[0] not in best or rule[position] > best[rule[0]][position]:
+                best[rule[0]] = rule
+
+        return tuple(sorted(best.values(), key=lambda x: x[position], reverse=True))
+
+    return {
+        "antecedents": list(compiled.keys()),
+        "trie": create_rule_trie(list(compiled.keys())),
+        "rules": [{"confidence": best_rules(ant_rules, 1), "lift": best_rules(ant_rules, 2)}
+                  for ant_rules in compiled.values()],
+    }
+
+
+def recommend_basket(basket_rules: dict, products: list, k: int = 10, metric: str = "lift"):
+    """
+    parameter
+    ---------
+    basket_rules: Output of `compile_basket_rules`.
+    products: The products in the basket.
+    k: The maximum number of products to return.
+    metric: The rule metric used to rank the products. Either 'lift' or 'confidence'.
+
+    return
+    ------
+    A list of up to `k` dictionaries with a consequent product not in the basket ('product'), the confidence and
+    lift of its best rule whose antecedents are all in the basket and the antecedents of that rule, ranked by
+    `metric`. The antecedents are matched with `match_rule_trie`.
+    """
+
+    match_arg(metric, ["lift", "confidence"])
+
+    if k < 1:
+        raise ValueError("argument `k` must be 1 or greater.")
+
+    position = 1 if metric == "confidence" else 2
+    purchased = set(products)
+
+    matched = [(basket_rules["antecedents"][i], basket_rules["rules"][i][metric])
+               for i in match_rule_trie(basket_rules["trie"], list(purchased))]
+
+    def ranked_rules(ant, ant_rules):
+        for rule in ant_rules:
+            yield -rule[position], rule, ant
+
+    # The rules of each antecedent are ordered by the metric, the first rule of a product is its best rule ------------:
+    recommendations = []
+    seen = set(purchased)
+
+    for _, rule, ant in merge(*[ranked_rules(ant, ant_rules) for ant, ant_rules in matched]):
+        if rule[0] in seen:
+            continue
+
+        seen.add(rule[0])
+        recommendations.append({"product": rule[0], "confidence": rule[1], "lift": rule[2], "antecedents": list(ant)})
+
+        if len(recommendations) == k:
+            break
+
+    return recommendations
+
+
+@instrument()
 def get_protential_customer_product(df: DataFrame,  # +++++++++++++++++++++
                                     ant_products: list = None,
                                     con_products: list = None,
-                                    just_customer_id: bool = False):
+                                    just_customer_id: bool = False,
+                                    customer_items: dict = None):
     """
     df product data.
     ant_products: [list|string] Selected product(s) from the antecedents column.
     con_products: [list|string] Selected product(s) from the consequents column.
     just_customer_id: Whether to return just the customer id that meet all conditions.
+    customer_items: A precomputed `create_customer_items` of `df`, it is created when not supplied.
 
     return
     ------
-    A pandas dataframe with a new column of likely product the customer can purchase.
+    A pandas dataframe with a new column of likely product the customer can purchase. The selected products are one
+    antecedent, its customers are the intersection of the sorted customer postings of its products by
+    `customers_with_products`, so the rule trie of `bulk_protential_customer_product` is not needed.
     """
 
     if ant_products == [] or con_products == []:
@@ -816,37 +1986,16 @@ def get_protential_customer_product(df: DataFrame,  # +++++++++++++++++++++
             {"Problem": [f"{rule_name} returned empty products, make sure all avaliable options have valid inputs"]}
         )
 
-    c_df = df.copy()
-
     likely_purchase = ", ".join(con_products) if isinstance(con_products, list) else con_products
 
-    product = get_product_variable(df=df)
+    if customer_items is None:
+        customer_items = create_customer_items(df=df)
 
-    if not isinstance(ant_products, list):
-        c_df = c_df.loc[c_df[product].str.contains(ant_products)]
+    made_same_purchase = customers_with_products(customer_items, ant_products)
 
-        c_df["Likely_Product_Purchase"] = likely_purchase
+    c_df = df.iloc[customer_product_rows(customer_items, made_same_purchase, ant_products)].copy()
 
-    else:
-        c_df = c_df.loc[c_df[product].str.contains("|".join(ant_products))]
-
-        more_products = c_df["Customer_ID"].value_counts() > 1
-        valid_customers = more_products[more_products == True].index
-
-        valid_customer_df = c_df.loc[c_df["Customer_ID"].isin(valid_customers)]
-
-        made_same_purchase = []
-
-        for cus_id in list(valid_customer_df["Customer_ID"].unique()):
-            get_customer_products = list(
-                valid_customer_df.loc[valid_customer_df["Customer_ID"] == cus_id][product].values)
-
-            if not Counter(get_customer_products) - Counter(ant_products):
-                made_same_purchase.append(cus_id)
-
-        c_df = valid_customer_df.loc[valid_customer_df["Customer_ID"].isin(made_same_purchase)].copy()
-
-        c_df["Likely_Product_Purchase"] = likely_purchase
+    c_df["Likely_Product_Purchase"] = likely_purchase
 
     if just_customer_id:
         return c_df.drop_duplicates(subset="Customer_ID").reset_index()[["Customer_ID"]]
@@ -854,11 +2003,13 @@ def get_protential_customer_product(df: DataFrame,  # +++++++++++++++++++++
         return c_df
 
 
+@instrument()
 def protential_customer_product(df: DataFrame,  # +++++++++++++++++++++
                                 ant_products: list = None,
                                 con_products: list = None,
                                 just_customer_id: bool = False,
-                                distinct_product_group: bool = False):
+                                distinct_product_group: bool = False,
+                                customer_items: dict = None):
     """
     parameter
     ---------
@@ -867,29 +2018,33 @@ def protential_customer_product(df: DataFrame,  # +++++++++++++++++++++
     con_products [list|string] Selected product(s) from the consequents column.
     just_customer_id: Whether to return just the customer id that meet all conditions.
     distinct_product_group: If True, each product will be treated as a single potential product.
+    customer_items: A precomputed `create_customer_items` of `df`, it is created when not supplied.
 
     return
     ------
     A pandas dataframe with a new column of likely product the customer can purchase.
     """
 
-    if distinct_product_group:
-        lpp_tbl = DataFrame()
+    if customer_items is None:
+        customer_items = create_customer_items(df=df)
 
-        for ant_product, con_product in zip(ant_products, con_products):
-            lpp_tbl = concat([lpp_tbl, get_protential_customer_product(df=df,
-                                                                       ant_products=ant_product,
-                                                                       con_products=con_product,
-                                                                       just_customer_id=just_customer_id)])
+    if distinct_product_group:
+        lpp_tbl = bulk_protential_customer_product(df=df,
+                                                   ant_products=ant_products,
+                                                   con_products=con_products,
+                                                   just_customer_id=just_customer_id,
+                                                   customer_items=customer_items)
     else:
         lpp_tbl = get_protential_customer_product(df=df,
                                                   ant_products=ant_products,
                                                   con_products=con_products,
-                                                  just_customer_id=just_customer_id)
+                                                  just_customer_id=just_customer_id,
+                                                  customer_items=customer_items)
 
     return lpp_tbl
 
 
+@instrument()
 def lump_product_data(df: DataFrame, threshold: int = 60):
     """
     parameter
@@ -944,6 +2099,7 @@ def lump_product_data(df: DataFrame, threshold: int = 60):
     return f_tbl
 
 
+@instrument()
 def rules_relationship(df: DataFrame,
                        x_var: str,
                        y_var: str,
@@ -951,7 +2107,12 @@ def rules_relationship(df: DataFrame,
                        opacity: float = None,
                        font_color: str = ft_color,
                        bg_color: str = plot_bg_color,
-                       grid_color: str = g_color):
+                       grid_color: str = g_color,
+                       gl_threshold: int = 1000,
+                       density_threshold: int = 50000,
+                       x_range: list = None,
+                       y_range: list = None,
+                       n_bins: int = 100):
     """
     parameter
     ---------
@@ -961,12 +2122,21 @@ def rules_relationship(df: DataFrame,
     font_color: plot font color.
     bg_color: plot background color.
     grid_color: color for the x-axis & y-axis grid.
+    gl_threshold: Above this number of rules the points are drawn with WebGL (scattergl).
+    density_threshold: Above this number of rules the rules are binned on the server and drawn as a heatmap of the
+                       number of rules (or the average `z_var`) in each bin. The variables are kept in the layout
+                       `meta` so the plot can be binned again when zoomed.
+    x_range,y_range: The [min, max] range of `x_var` and `y_var` to bin, the full range is used when not supplied.
+    n_bins: The number of bins on each axis of the heatmap.
 
     value
     -----
     A plotly.graph_objects.Figure object.
     """
 
+    from plotly.express import scatter
+    from plotly.graph_objects import Figure, Heatmap
+
     valid_variables = ["support", "confidence", "lift", "leverage", "conviction",
                        "antecedent support", "consequent support"]
 
@@ -976,6 +2146,8 @@ def rules_relationship(df: DataFrame,
         if lab is not None:
             var_labels.append(str.title(lab))
 
+    n_rules = df.shape[0]
+
     # z_variable = None if z_var == "No Selection" else z_var
     def plotly_scatter(labs: str,
                        title: str,
@@ -994,10 +2166,56 @@ def rules_relationship(df: DataFrame,
             color_continuous_scale=f_c_color,
             hover_data=hover_data,
             opacity=opacity,
+            render_mode="webgl" if n_rules > gl_threshold else "svg",
             template="plotly_white"
         )
         return f_plt
 
+    def plotly_density(title: str, z_var: str = z_var):
+        x_values = df[x_var].to_numpy(dtype="float64")
+        y_values = df[y_var].to_numpy(dtype="float64")
+        finite = np.isfinite(x_values) & np.isfinite(y_values)
+
+        def value_range(values, supplied_range):
+            if supplied_range is not None:
+                return [float(supplied_range[0]), float(supplied_range[1])]
+            elif values.shape[0] > 0:
+                return [float(values.min()), float(values.max())]
+            else:
+                return [0.0, 1.0]
+
+        bin_range = [value_range(x_values[finite], x_range), value_range(y_values[finite], y_range)]
+
+        counts, x_edges, y_edges = np.histogram2d(x_values[finite], y_values[finite], bins=n_bins, range=bin_range)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if z_var is None:
+                z_values = np.where(counts > 0, counts, nan)
+                z_label = "Rules"
+            else:
+                z_sum = np.histogram2d(x_values[finite], y_values[finite], bins=n_bins, range=bin_range,
+                                       weights=df[z_var].to_numpy(dtype="float64")[finite])[0]
+                z_values = np.where(counts > 0, z_sum / counts, nan)
+                z_label = f"Average {var_labels[2]}"
+
+        f_plt = Figure(
+            Heatmap(
+                x=(x_edges[:-1] + x_edges[1:]) / 2,
+                y=(y_edges[:-1] + y_edges[1:]) / 2,
+                z=z_values.T,
+                colorscale=["#00FA9A", "#FFD700", "#CD0000"],
+                colorbar={"title": z_label},
+                hovertemplate=f"{var_labels[0]}: %{{x:.4f}}<br>{var_labels[1]}: %{{y:.4f}}<br>{z_label}: %{{z:,.4f}}"
+                              "<extra></extra>",
+            )
+        )
+        f_plt.update_layout(title=title, template="plotly_white", xaxis_title=var_labels[0],
+                            yaxis_title=var_labels[1], meta={"x_var": x_var, "y_var": y_var, "z_var": z_var})
+        f_plt.update_xaxes(range=bin_range[0])
+        f_plt.update_yaxes(range=bin_range[1])
+
+        return f_plt
+
     if z_var is None:
         if len(set([x_var, y_var])) < 2:
             raise ValueError("argument `x_var` and `y_var` must be unique and not empty.")
@@ -1005,12 +2223,17 @@ def rules_relationship(df: DataFrame,
         if not all([cols in valid_variables for cols in [x_var, y_var]]):
             raise ValueError("An Invalid variable argument was supplied")
 
-        f_fig = plotly_scatter(
-            f_d_color=["#FFD700"],
-            labs={x_var: var_labels[0], y_var: var_labels[1]},
-            title=f"Relationship between {var_labels[0]} & {var_labels[1]} For {df.shape[0]:,} Rules",
-            hover_data={x_var: ":.4f", y_var: ":.4f"},
-        )
+        title = f"Relationship between {var_labels[0]} & {var_labels[1]} For {n_rules:,} Rules"
+
+        if n_rules > density_threshold:
+            f_fig = plotly_density(title=title)
+        else:
+            f_fig = plotly_scatter(
+                f_d_color=["#FFD700"],
+                labs={x_var: var_labels[0], y_var: var_labels[1]},
+                title=title,
+                hover_data={x_var: ":.4f", y_var: ":.4f"},
+            )
 
     else:
         if len(set([x_var, y_var, z_var])) < 3:
@@ -1019,12 +2242,17 @@ def rules_relationship(df: DataFrame,
         if not all([cols in valid_variables for cols in [x_var, y_var, z_var]]):
             raise ValueError("An Invalid variable argument was supplied")
 
-        f_fig = plotly_scatter(
-            f_c_color=["#00FA9A", "#FFD700", "#CD0000"],
-            labs={x_var: var_labels[0], y_var: var_labels[1], z_var: var_labels[2]},
-            title=f"Relationship between {var_labels[0]}, {var_labels[1]} & {var_labels[2]} For {df.shape[0]:,} Rules",
-            hover_data={x_var: ":.4f", y_var: ":.4f", z_var: ":.4f"}
-        )
+        title = f"Relationship between {var_labels[0]}, {var_labels[1]} & {var_labels[2]} For {n_rules:,} Rules"
+
+        if n_rules > density_threshold:
+            f_fig = plotly_density(title=title)
+        else:
+            f_fig = plotly_scatter(
+                f_c_color=["#00FA9A", "#FFD700", "#CD0000"],
+                labs={x_var: var_labels[0], y_var: var_labels[1], z_var: var_labels[2]},
+                title=title,
+                hover_data={x_var: ":.4f", y_var: ":.4f", z_var: ":.4f"}
+            )
 
     f_fig.update_layout(plot_bgcolor=bg_color, paper_bgcolor=bg_color, title_font_color=font_color)
     f_fig.update_yaxes(color=font_color, showgrid=True, gridwidth=1, gridcolor=grid_color)
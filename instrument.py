@@ -0,0 +1,263 @@
+"""
+Per stage instrumentation of the app: wall time, payload bytes and peak allocated memory of the decorated callbacks and
+functions, exposed in the Prometheus text format by `metrics_text`.
+
+Memory and profiling cost time, so they are enabled with environment variables:
+
+MBA_TRACEMALLOC=1          Record the peak memory allocated during each stage with tracemalloc.
+MBA_PROFILE_DIR=<path>     Profile each outermost stage with cProfile and dump the slow calls to `<path>`.
+MBA_PROFILE_SECONDS=<s>    The wall time above which a profiled call is dumped, 1 second by default.
+"""
+import cProfile
+import os
+import re
+import time
+import tracemalloc
+from functools import wraps
+from threading import Lock, local
+
+TRACE_MEMORY = os.environ.get("MBA_TRACEMALLOC", "0") not in ("", "0")
+PROFILE_DIR = os.environ.get("MBA_PROFILE_DIR") or None
+PROFILE_SECONDS = float(os.environ.get("MBA_PROFILE_SECONDS", "1"))
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+if TRACE_MEMORY and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+if PROFILE_DIR is not None:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+
+stage_metrics = {}
+metrics_lock = Lock()
+
+# The stages running in the current thread, outermost first --------------------------------------------------------|
+active_stages = local()
+
+
+def payload_bytes(value):
+    """
+    parameter
+    ---------
+    value: An argument or return value of a stage.
+
+    return
+    ------
+    The size of `value` in bytes, the length of strings, the shallow memory of numpy arrays and pandas objects and the
+    sum of the sizes of the items of lists, tuples and dictionaries. Other values count as 0 bytes.
+    """
+    if isinstance(value, (str, bytes, bytearray)):
+        return len(value)
+
+    if hasattr(value, "memory_usage") and hasattr(value, "index"):
+        usage = value.memory_usage(index=True, deep=False)
+        return int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+
+    if hasattr(value, "nbytes") and hasattr(value, "dtype"):
+        return int(value.nbytes)
+
+    if isinstance(value, (list, tuple)):
+        return sum(payload_bytes(item) for item in value)
+
+    if isinstance(value, dict):
+        return sum(payload_bytes(item) for item in value.values())
+
+    return 0
+
+
+def stage_record(stage: str):
+    """
+    The metrics of `stage`, created on its first call. `metrics_lock` must be held.
+    """
+    if stage not in stage_metrics:
+        stage_metrics[stage] = {
+            "calls": 0, "errors": 0, "seconds": 0.0, "max_seconds": 0.0, "buckets": [0] * len(SECONDS_BUCKETS),
+            "input_bytes": 0, "output_bytes": 0, "peak_bytes": 0,
+        }
+
+    return stage_metrics[stage]
+
+
+def record_stage(stage: str, seconds: float, input_bytes: int = 0, output_bytes: int = 0, peak_bytes: int = 0,
+                 error: bool = False):
+    """
+    Add a call of `stage` to the metrics.
+    """
+    with metrics_lock:
+        record = stage_record(stage)
+
+        record["calls"] += 1
+        record["errors"] += int(error)
+        record["seconds"] += seconds
+        record["max_seconds"] = max(record["max_seconds"], seconds)
+        record["input_bytes"] += input_bytes
+        record["output_bytes"] += output_bytes
+        record["peak_bytes"] = max(record["peak_bytes"], peak_bytes)
+
+        # The buckets are cumulative, as in a Prometheus histogram ---------------------------------------------------|
+        for i, bound in enumerate(SECONDS_BUCKETS):
+            if seconds <= bound:
+                record["buckets"][i] += 1
+
+
+def record_payload(stage: str, input_bytes: int = 0, output_bytes: int = 0):
+    """
+    Add payload bytes measured outside the stage, e.g. the request and response of a callback, to `stage`.
+    """
+    with metrics_lock:
+        record = stage_record(stage)
+
+        record["input_bytes"] += input_bytes
+        record["output_bytes"] += output_bytes
+
+
+def instrument(stage: str = None, payload: bool = True):
+    """
+    parameter
+    ---------
+    stage: The name of the stage, `<module>.<function>` by default.
+    payload: Whether to measure the bytes of the arguments and the return value with `payload_bytes`.
+
+    return
+    ------
+    A decorator recording the wall time, payload bytes and peak allocated memory of each call. When tracing memory,
+    nested stages are included in the peak of the stages they run in. When profiling, only the outermost stage of a
+    thread is profiled.
+    """
+
+    def decorator(func):
+        name = stage or f"{func.__module__}.{func.__name__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            stack = getattr(active_stages, "stack", None)
+
+            if stack is None:
+                stack = active_stages.stack = []
+
+            profiler = cProfile.Profile() if PROFILE_DIR is not None and len(stack) == 0 else None
+
+            if TRACE_MEMORY:
+                # Keep the peak the enclosing stage reached so far, before this stage resets it ----------------------|
+                if len(stack) > 0:
+                    stack[-1] = max(stack[-1], tracemalloc.get_traced_memory()[1])
+
+                start_bytes = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+
+            # The peak of the stages nested in this one, a nested stage resets the tracemalloc peak -------------------|
+            stack.append(0)
+            error = True
+            start = time.perf_counter()
+
+            try:
+                if profiler is not None:
+                    result = profiler.runcall(func, *args, **kwargs)
+                else:
+                    result = func(*args, **kwargs)
+
+                error = False
+            finally:
+                seconds = time.perf_counter() - start
+                nested_peak = stack.pop()
+                peak_bytes = 0
+
+                if TRACE_MEMORY:
+                    peak = max(tracemalloc.get_traced_memory()[1], nested_peak)
+                    peak_bytes = max(peak - start_bytes, 0)
+
+                    if len(stack) > 0:
+                        stack[-1] = max(stack[-1], peak)
+
+                input_bytes = payload_bytes(args) + payload_bytes(kwargs) if payload else 0
+                output_bytes = payload_bytes(result) if payload and not error else 0
+
+                record_stage(name, seconds, input_bytes, output_bytes, peak_bytes, error)
+
+                if profiler is not None and seconds >= PROFILE_SECONDS:
+                    file_name = re.sub(r"[^\w.-]+", "_", name).strip("_")
+                    profiler.dump_stats(os.path.join(PROFILE_DIR, f"{file_name}-{time.strftime('%Y%m%d-%H%M%S')}-"
+                                                                  f"{int(seconds * 1000)}ms.prof"))
+
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def instrument_callbacks(callback, callback_map: dict):
+    """
+    parameter
+    ---------
+    callback: The `callback` decorator of a Dash app.
+    callback_map: The `callback_map` of the same app.
+
+    return
+    ------
+    A `callback` decorator that instruments each callback as the stage `callback.<output>` before registering it,
+    where `<output>` is the key of the callback in `callback_map`, its output ids and properties, so callbacks sharing
+    a function name are recorded apart. The payload of a callback is the size of its request and response, added by
+    the server with `record_payload`.
+    """
+
+    @wraps(callback)
+    def instrumented_callback(*args, **kwargs):
+        registered = set(callback_map)
+        register = callback(*args, **kwargs)
+        output = next((key for key in callback_map if key not in registered), None)
+
+        def decorator(func):
+            stage = f"callback.{output if output is not None else func.__name__}"
+            return register(instrument(stage=stage, payload=False)(func))
+
+        return decorator
+
+    return instrumented_callback
+
+
+def label_value(value: str):
+    """
+    `value` escaped for a label value of the Prometheus text format.
+    """
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def metrics_text():
+    """
+    The metrics of every stage in the Prometheus text exposition format.
+    """
+    with metrics_lock:
+        records = {stage: dict(record, buckets=list(record["buckets"])) for stage, record in stage_metrics.items()}
+
+    metrics = [
+        ("mba_stage_calls_total", "counter", "Number of calls of the stage.", "calls"),
+        ("mba_stage_errors_total", "counter", "Number of calls of the stage that raised an exception.", "errors"),
+        ("mba_stage_seconds_max", "gauge", "Longest wall time of a call of the stage in seconds.", "max_seconds"),
+        ("mba_stage_input_bytes_total", "counter", "Bytes of the stage inputs.", "input_bytes"),
+        ("mba_stage_output_bytes_total", "counter", "Bytes of the stage outputs.", "output_bytes"),
+        ("mba_stage_peak_memory_bytes", "gauge", "Largest peak memory allocated during a call of the stage, "
+                                                 "recorded with MBA_TRACEMALLOC=1.", "peak_bytes"),
+    ]
+
+    lines = []
+
+    for metric, metric_type, description, field in metrics:
+        lines += [f"# HELP {metric} {description}", f"# TYPE {metric} {metric_type}"]
+        lines += [f'{metric}{{stage="{label_value(stage)}"}} {record[field]}'
+                  for stage, record in sorted(records.items())]
+
+    lines += ["# HELP mba_stage_seconds Wall time of the calls of the stage in seconds.",
+              "# TYPE mba_stage_seconds histogram"]
+
+    for stage, record in sorted(records.items()):
+        stage = label_value(stage)
+
+        for bound, count in zip(SECONDS_BUCKETS, record["buckets"]):
+            lines.append(f'mba_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+
+        lines += [f'mba_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {record["calls"]}',
+                  f'mba_stage_seconds_sum{{stage="{stage}"}} {record["seconds"]}',
+                  f'mba_stage_seconds_count{{stage="{stage}"}} {record["calls"]}']
+
+    return "\n".join(lines) + "\n"
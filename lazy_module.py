@@ -0,0 +1,27 @@
+"""
+Deferred imports of heavy modules, so the app starts without loading pandas, the mining libraries or plotly.
+"""
+from importlib import import_module
+
+
+class LazyModule:
+    """
+    A stand-in for the module `name`, which is imported on the first attribute access and used from then on. The
+    import lock of `import_module` makes the first access thread safe.
+    """
+
+    def __init__(self, name: str):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def __getattr__(self, attr):
+        module = self.__dict__["_module"]
+
+        if module is None:
+            module = self.__dict__["_module"] = import_module(self.__dict__["_name"])
+
+        return getattr(module, attr)
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_module"] is not None else "not loaded"
+        return f"<lazy module '{self.__dict__['_name']}' ({state})>"
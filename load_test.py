@@ -0,0 +1,140 @@
+"""
+Load test of the /api/recommend endpoint.
+
+By default every worker process imports the app, prepares a rule set mined from the demo data and sends requests
+through the Flask test client, so the throughput of each worker is the throughput of one server worker. With --url
+the requests are sent to a running server, e.g. `gunicorn -w 1 mba_app:server`, for the rule set --rule-set listed by
+its /api/rule-sets, and the throughput is divided by --server-workers. Rule sets are held in the memory of the server
+worker that created them, so a rule set key is only found by one worker of a server with several workers.
+
+    python load_test.py --workers 4 --requests 5000
+    python load_test.py --url http://127.0.0.1:8000 --rule-set <key> --workers 8 --server-workers 4
+"""
+import argparse
+import json
+import time
+import warnings
+from http.client import HTTPConnection
+from multiprocessing import Pool
+from urllib.parse import urlparse
+
+import numpy as np
+import pandas as pd
+
+DATA_PATH = "demo_trans.csv"
+
+
+def sample_baskets(n_baskets: int, seed: int):
+    """
+    A list of `n_baskets` product lists of random demo customers.
+    """
+    trans_tbl = pd.read_csv(DATA_PATH)
+    product = "Product_Taxonomy" if "Product_Taxonomy" in trans_tbl.columns else "Product"
+
+    baskets = trans_tbl.groupby("Customer_ID")[product].agg(lambda x: sorted(set(x))).to_list()
+    sampled = np.random.default_rng(seed).integers(0, len(baskets), n_baskets)
+
+    return [baskets[i] for i in sampled]
+
+
+def client_sender(min_support: float):
+    import mba_app
+    import server_cache
+
+    rules = mba_app.mba_fun.create_association_rule(df=mba_app.demo_transactions(), min_support=min_support,
+                                                    rule_metric="lift", min_threshold=0.5)
+    rule_key = server_cache.prepare_rules(rules.to_json(date_format="iso", orient="split"))[0]
+    client = mba_app.server.test_client()
+
+    def send(payload):
+        response = client.post("/api/recommend", json=dict(payload, rule_set=rule_key))
+        return response.status_code, response.get_data()
+
+    return send
+
+
+def http_sender(url: str, rule_key: str):
+    parsed = urlparse(url)
+    connection = HTTPConnection(parsed.hostname, parsed.port or 80)
+
+    def send(payload):
+        connection.request("POST", "/api/recommend", body=json.dumps(dict(payload, rule_set=rule_key)),
+                           headers={"Content-Type": "application/json"})
+        response = connection.getresponse()
+        return response.status, response.read()
+
+    return send
+
+
+def run_worker(worker_args):
+    worker, args = worker_args
+    warnings.filterwarnings("ignore")
+
+    send = http_sender(args.url, args.rule_set) if args.url else client_sender(args.min_support)
+    payloads = [{"products": basket, "k": args.k, "metric": args.metric}
+                for basket in sample_baskets(args.requests + args.warmup, seed=worker)]
+
+    for payload in payloads[:args.warmup]:
+        status, body = send(payload)
+
+        if status != 200:
+            raise RuntimeError(f"request failed with status {status}: {body[:200]}")
+
+    latencies = np.empty(args.requests)
+    succeeded = np.zeros(args.requests, dtype=bool)
+
+    start = time.perf_counter()
+
+    for i, payload in enumerate(payloads[args.warmup:]):
+        request_start = time.perf_counter()
+        status, _ = send(payload)
+        latencies[i] = time.perf_counter() - request_start
+        succeeded[i] = status == 200
+
+    # Failed requests are counted apart, they do not add to the throughput or the latencies ---------------------------:
+    return worker, time.perf_counter() - start, latencies[succeeded], int((~succeeded).sum())
+
+
+def percentile_ms(latencies, q: float):
+    return np.percentile(latencies, q) * 1000 if len(latencies) > 0 else np.nan
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the product recommendation endpoint.")
+    parser.add_argument("--url", default=None, help="A running server, the app is run in process when not supplied.")
+    parser.add_argument("--workers", type=int, default=2, help="Number of worker processes sending requests.")
+    parser.add_argument("--rule-set", default=None, help="The rule set key of the server behind --url.")
+    parser.add_argument("--server-workers", type=int, default=None,
+                        help="Number of server workers behind --url, used for the throughput per worker.")
+    parser.add_argument("--requests", type=int, default=2000, help="Number of timed requests per worker.")
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--min-support", type=float, default=0.001)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--metric", default="lift", choices=["lift", "confidence"])
+    args = parser.parse_args()
+
+    if args.url and not args.rule_set:
+        parser.error("--rule-set is required with --url, list the rule sets of the server with GET /api/rule-sets.")
+
+    with Pool(args.workers) as pool:
+        results = pool.map(run_worker, [(worker, args) for worker in range(args.workers)])
+
+    print(f"{'worker':>6} {'requests':>9} {'failed':>7} {'req/s':>9} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+
+    for worker, elapsed, latencies, failed in results:
+        print(f"{worker:>6} {len(latencies):>9,} {failed:>7,} {len(latencies) / elapsed:>9,.0f} "
+              f"{percentile_ms(latencies, 50):>9.2f} {percentile_ms(latencies, 99):>9.2f}")
+
+    all_latencies = np.concatenate([latencies for _, _, latencies, _ in results])
+    all_failed = sum(failed for _, _, _, failed in results)
+    throughput = sum(len(latencies) / elapsed for _, elapsed, latencies, _ in results)
+
+    print(f"{'total':>6} {len(all_latencies):>9,} {all_failed:>7,} {throughput:>9,.0f} "
+          f"{percentile_ms(all_latencies, 50):>9.2f} {percentile_ms(all_latencies, 99):>9.2f}")
+
+    if args.url and args.server_workers:
+        print(f"throughput per server worker: {throughput / args.server_workers:,.0f} req/s")
+
+
+if __name__ == "__main__":
+    main()
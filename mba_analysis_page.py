@@ -2,7 +2,6 @@ import dash
 from dash import Input, Output, State, dcc, html, dash_table, ctx, ALL, MATCH
 import dash_bootstrap_components as dbc
 
-import function as mba_fun
 import ui_component as comp_fun
 
 run_mba_analysis = dbc.Container(
@@ -126,6 +125,28 @@ run_mba_analysis = dbc.Container(
 
                                         html.Br(),
 
+                                        dbc.Checklist(
+                                            id="prune_redundant_rules",
+                                            options=[{"label": "Remove Redundant Rules", "value": "prune"}],
+                                            value=[],
+                                            switch=True,
+                                            input_class_name="dash-control-bc",
+                                            persistence=True,
+                                            persistence_type="memory",
+                                        ),
+
+                                        dbc.Tooltip(
+                                            """
+                                            Remove rules with the same consequents as a rule with fewer antecedents
+                                            but no higher confidence or lift.
+                                            """,
+                                            target="prune_redundant_rules",
+                                            placement="right",
+                                            delay={"hide": 200}
+                                        ),
+
+                                        html.Br(),
+
                                         html.Div(
                                             [
                                                 dbc.Button(
@@ -156,7 +177,7 @@ run_mba_analysis = dbc.Container(
                                         dcc.Loading(
                                             html.Div(id="mba_analysis_output", ),
                                             id="mba_analysis_spinner",
-                                            color=mba_fun.spinner_color,
+                                            color=comp_fun.spinner_color,
                                         ),
                                     ]
                                 )
@@ -264,7 +285,7 @@ mba_rules_filter_summary = dbc.Container(
                                         dcc.Loading(
                                             html.Div(id="mba_query_output", ),
                                             id="mba_query_spinner",
-                                            color=mba_fun.spinner_color,
+                                            color=comp_fun.spinner_color,
                                         )
                                     ]
                                 )
@@ -296,7 +317,7 @@ mba_rules_filter_summary = dbc.Container(
                                         dcc.Loading(
                                             html.Div(id="metric_relationship_plot"),
                                             id="metric_rel_spinner",
-                                            color=mba_fun.spinner_color,
+                                            color=comp_fun.spinner_color,
                                         ),
                                     ]
                                 )
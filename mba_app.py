@@ -1,19 +1,44 @@
+from functools import lru_cache
+from importlib import import_module
+
 import dash
 from dash import Input, Output, State, dcc, html, dash_table, ctx, ALL, MATCH
 import dash_bootstrap_components as dbc
+from flask import Response, request, jsonify
 
-import pandas as pd
+import ui_component as comp_fun
+import instrument
+from lazy_module import LazyModule
 
-from home_page import home_content
-from dashboard_page import dashboard_layout
-from mba_analysis_page import *
-from assign_prod_page import get_likely_products
+# pandas, the mining libraries and plotly load with these modules on the first callback that needs them ---------|
+mba_fun = LazyModule("function")
+server_cache = LazyModule("server_cache")
 
-import ui_component as comp_fun
-import function as mba_fun
+# The layout of each page, imported from its module when the page is first visited -------------------------------|
+page_layouts = {
+    "/": ("home_page", "home_content"),
+    "/dashboard": ("dashboard_page", "dashboard_layout"),
+    "/mba": ("mba_analysis_page", "mba_analysis_layout"),
+    "/assign-products": ("assign_prod_page", "get_likely_products"),
+}
+
+
+@lru_cache(maxsize=1)
+def read_demo_transactions():
+    """
+    The demo transaction data, read on first use. It is shared by every session and must not be modified.
+    """
+    from pandas import read_csv
+
+    return read_csv("demo_trans.csv").drop("Unnamed: 0", axis=1)
+
+
+def demo_transactions():
+    """
+    A copy of the demo transaction data, which callers may modify.
+    """
+    return read_demo_transactions().copy()
 
-trans_df = pd.read_csv("demo_trans.csv")
-trans_df = trans_df.drop("Unnamed: 0", axis=1)
 
 app = dash.Dash(__name__,
                 external_stylesheets=[dbc.themes.PULSE, dbc.icons.BOOTSTRAP],
@@ -22,6 +47,9 @@ app = dash.Dash(__name__,
 
 server = app.server
 
+# Record the wall time of every callback, the payload of each callback request is added by the server -------------|
+app.callback = instrument.instrument_callbacks(app.callback, app.callback_map)
+
 
 # Layout ===============================================================================================================
 app.layout = html.Div(
@@ -41,6 +69,7 @@ app.layout = html.Div(
             html.Div(
                 [
                     dcc.Store(id="store_data"),
+                    dcc.Store(id="store_data_key"),
                     dcc.Store(id="store_rule_data"),
                     dcc.Store(id="filter_rule_data"),
                 ],
@@ -50,18 +79,123 @@ app.layout = html.Div(
 )
 
 
+# Helper ===============================================================================================================
+def create_server_dataframe(df, page_size=10, precision=2, file_name="result", rule_set_key=None, sort_by=None):
+    # `df` may be a cached result, its column names are cleaned on a shallow copy ------------------------------------|
+    d_tbl = comp_fun.clean_column_names(df.copy(deep=False))
+    result_handle = server_cache.store_result(d_tbl)
+
+    # Only the first page is ordered, descending by the `sort_by` variable of `df` ------------------------------------|
+    if sort_by is not None:
+        sort_by = [{"column_id": d_tbl.columns[df.columns.get_loc(sort_by)], "direction": "desc"}]
+
+    return comp_fun.create_dataframe(df=d_tbl, page_size=page_size, precision=precision, result_handle=result_handle,
+                                     file_name=file_name, rule_set_key=rule_set_key, sort_by=sort_by,
+                                     page_data=server_cache.result_page(result_handle, 0, page_size, sort_by))
+
+
+def dataset_artifacts(data_key):
+    # The dataset is prepared once by `prepare_data_artifacts`, a key evicted since then returns None ---------------|
+    return server_cache.dataset_cache.get(data_key) if data_key is not None else None
+
+
+def rule_length_count(jsonified_rule_data, rule_type, comp_op, length):
+    if jsonified_rule_data is None or rule_type is None:
+        return None, dash.no_update
+
+    rule_lengths = server_cache.prepare_rules(jsonified_rule_data)[1]["rule_lengths"]
+    histogram = rule_lengths[rule_type]["histogram"]
+
+    if comp_op is None or length is None:
+        counts = ", ".join([f"{n_product}: {n_rule:,}" for n_product, n_rule in enumerate(histogram) if n_rule > 0])
+        return f"Rules by number of products - {counts}", histogram.shape[0] - 1
+
+    n_match = mba_fun.count_rules_length(rule_lengths, rule_type, comp_op, length)
+
+    return f"{n_match:,} of {histogram.sum():,} rules match.", histogram.shape[0] - 1
+
+
+def create_filter_query(button_id, combine_filters, contain_values, metric_values, length_values):
+    """
+    Create the rule query of a filter panel. The clause of the clicked filter button is always used, with
+    `combine_filters` on the completed clauses of the other filters are added.
+    """
+    f_rule_type, f_product_type, bitwise_opt, s_rule_type, s_product_type, search_type = contain_values
+    len_rule_type, len_comp_opt, len_n_product = length_values
+
+    combine = bool(combine_filters)
+    clauses = {}
+
+    if button_id.endswith("_filter_rule_contain_products") or (combine and f_rule_type and f_product_type):
+        clauses["products"] = {"search_type": search_type, "f_rule_type": f_rule_type,
+                               "f_product_type": f_product_type, "s_rule_type": s_rule_type,
+                               "s_product_type": s_product_type, "bitwise_opt": bitwise_opt}
+
+    if button_id.endswith("_filter_rule_query_metrics") or combine:
+        cleaned_values = mba_fun.get_query_values(*metric_values)
+
+        if button_id.endswith("_filter_rule_query_metrics") or cleaned_values[0]:
+            clauses["metrics"] = {"query_values": cleaned_values[0], "comp_op": cleaned_values[1],
+                                  "bitw_op": cleaned_values[2]}
+
+    if button_id.endswith("_filter_rule_rule_length") or \
+            (combine and None not in [len_rule_type, len_comp_opt, len_n_product]):
+        clauses["length"] = {"rule_type": len_rule_type, "comp_op": len_comp_opt, "length": len_n_product}
+
+    return mba_fun.create_rule_query(**clauses)
+
+
+def filter_rule_output(jsonified_rule_data, button_id, combine_filters, contain_values, metric_values, length_values):
+    """
+    Filter the rules for a filter panel, both panels share the filter results of `server_cache.filter_rule_set`.
+    """
+    rule_query = create_filter_query(button_id=button_id,
+                                     combine_filters=combine_filters,
+                                     contain_values=contain_values,
+                                     metric_values=metric_values,
+                                     length_values=length_values)
+
+    result = server_cache.filter_rule_set(jsonified_rule_data, rule_query)[1]
+
+    filtered_output = create_server_dataframe(df=result["display"], page_size=14, precision=4,
+                                              file_name="filtered_rules")
+    desc_output = comp_fun.create_description_table(m_dict=result["description"], return_type="rules",
+                                                    return_name="Filtered Data")
+
+    return filtered_output, desc_output, result["rules"]
+
+
+def zoom_ranges(relayout_data, layout):
+    """
+    The x and y ranges to bin after a zoom or reset of a plot with `layout`, or None when neither axis changed. An
+    axis that was not zoomed keeps the range it was binned with, an axis that was reset uses its full range (None).
+    """
+    changed = [key for key in relayout_data if key.startswith(("xaxis.range", "yaxis.range", "xaxis.autorange",
+                                                                "yaxis.autorange"))]
+
+    if len(changed) == 0:
+        return None
+
+    def axis_range(axis):
+        if f"{axis}.autorange" in relayout_data:
+            return None
+        elif f"{axis}.range[0]" in relayout_data:
+            return [relayout_data[f"{axis}.range[0]"], relayout_data[f"{axis}.range[1]"]]
+        elif f"{axis}.range" in relayout_data:
+            return relayout_data[f"{axis}.range"]
+        else:
+            return (layout.get(axis) or {}).get("range")
+
+    return axis_range("xaxis"), axis_range("yaxis")
+
+
 # Callback =============================================================================================================
 
 @app.callback(Output("current_page", "children"), Input("url", "pathname"), )
 def render_page_content(pathname):
-    if pathname == "/":
-        return home_content
-    elif pathname == "/dashboard":
-        return dashboard_layout
-    elif pathname == "/mba":
-        return mba_analysis_layout
-    elif pathname == "/assign-products":
-        return get_likely_products
+    if pathname in page_layouts:
+        module_name, layout_name = page_layouts[pathname]
+        return getattr(import_module(module_name), layout_name)
 
 
 @app.callback(
@@ -89,10 +223,10 @@ def toggle_grouped_modal(open_click, is_open):
 @app.callback(Output("store_data", "data"), Input("use_product", "n_clicks"), Input("use_product_tax", "n_clicks"), )
 def update_data_choice(use_grouped_products, use_products_tax):
     if use_grouped_products and use_products_tax == 0:
-        return trans_df.to_json(date_format="iso", orient="split")
+        return demo_transactions().to_json(date_format="iso", orient="split")
 
     elif use_grouped_products == 0 and use_products_tax > 0:
-        prod_tax = mba_fun.lump_product_data(df=trans_df, threshold=60)
+        prod_tax = mba_fun.lump_product_data(df=demo_transactions(), threshold=60)
         return prod_tax.to_json(date_format="iso", orient="split")
 
     elif use_grouped_products and use_products_tax:
@@ -100,14 +234,41 @@ def update_data_choice(use_grouped_products, use_products_tax):
             button_id = ctx.triggered_id
 
             if button_id == "use_product":
-                return trans_df.to_json(date_format="iso", orient="split")
+                return demo_transactions().to_json(date_format="iso", orient="split")
             elif button_id == "use_product_tax":
-                prod_tax = mba_fun.lump_product_data(df=trans_df, threshold=60)
+                prod_tax = mba_fun.lump_product_data(df=demo_transactions(), threshold=60)
                 return prod_tax.to_json(date_format="iso", orient="split")
     else:
         dash.no_update
 
 
+@app.callback(Output("store_data_key", "data"), Input("store_data", "data"), )
+def prepare_data_artifacts(jsonified_data):
+    if jsonified_data is not None:
+        data_key, _ = server_cache.prepare_dataset(jsonified_data)
+        return data_key
+    else:
+        return dash.no_update
+
+
+@app.callback(
+    Output({"type": "server_table", "index": MATCH}, "data"),
+    Output({"type": "server_table_message", "index": MATCH}, "children"),
+    Input({"type": "server_table", "index": MATCH}, "page_current"),
+    Input({"type": "server_table", "index": MATCH}, "page_size"),
+    Input({"type": "server_table", "index": MATCH}, "sort_by"),
+    State({"type": "server_table", "index": MATCH}, "id"),
+    prevent_initial_call=True,
+)
+def update_server_table_page(page_current, page_size, sort_by, table_id):
+    page = server_cache.result_page(table_id["index"], page_current or 0, page_size, sort_by)
+
+    if page is not None:
+        return page.to_dict("records"), None
+    else:
+        return dash.no_update, "This result has expired on the server, run it again to page, sort or download it."
+
+
 @app.callback(
     Output("collapse_product_quantity_content", "is_open"),
     Input("collapse_product_quantity_settings", "n_clicks"),
@@ -141,28 +302,23 @@ def toggle_collapse_profitable(n, is_open):
     Output("total_sales", "children"),
     Output("average_sales", "children"),
     Output("n_unique_products", "children"),
-    Input("store_data", "data"),
+    Input("store_data_key", "data"),
 )
-def update_no_transaction(jsonified_data):
-    if jsonified_data is not None:
-        trans_tbl = pd.read_json(jsonified_data, orient="split")
+def update_no_transaction(data_key):
+    artifacts = dataset_artifacts(data_key)
 
-        n_transactions = mba_fun.create_data_info(df=trans_tbl, info_type="no_transaction")
-        n_transactions_output = comp_fun.value_box(title="Unique Transactions", value=n_transactions)
+    if artifacts is not None:
+        kpis = artifacts["kpis"]
 
-        n_unique_customers = mba_fun.create_data_info(df=trans_tbl, info_type="no_unique_customers")
-        n_unique_customers_output = comp_fun.value_box(title="Unique Customers", value=n_unique_customers)
-
-        total_sales = mba_fun.create_data_info(df=trans_tbl, info_type="total_sales")
-        total_sales_out = comp_fun.value_box(title="Total Sales", value=total_sales)
-
-        average_sales = mba_fun.create_data_info(df=trans_tbl, info_type="average_sales")
-        average_sales_out = comp_fun.value_box(title="Average Sales", value=average_sales)
-
-        n_unique_products = mba_fun.create_data_info(df=trans_tbl, info_type="unique_products")
-        n_unique_products_out = comp_fun.value_box(title="Unique Products", value=n_unique_products)
+        n_transactions_output = comp_fun.value_box(title="Unique Transactions", value=kpis["no_transaction"])
+        n_unique_customers_output = comp_fun.value_box(title="Unique Customers", value=kpis["no_unique_customers"])
+        total_sales_out = comp_fun.value_box(title="Total Sales", value=kpis["total_sales"])
+        average_sales_out = comp_fun.value_box(title="Average Sales", value=kpis["average_sales"])
+        n_unique_products_out = comp_fun.value_box(title="Unique Products", value=kpis["unique_products"])
 
         return n_transactions_output, n_unique_customers_output, total_sales_out, average_sales_out, n_unique_products_out
+    elif data_key is not None:
+        return dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update
     else:
         def no_output():
             return comp_fun.value_box(title="Updating..", value="...")
@@ -172,64 +328,80 @@ def update_no_transaction(jsonified_data):
 
 @app.callback(
     Output("product_quantity_output", "children"),
-    Input("store_data", "data"),
+    Input("store_data_key", "data"),
     Input("product_quantity_agg", "value"),
     Input("product_quantity_output_type", "value"),
     Input("product_quantity_nunique", "value"),
 )
-def update_product_quantity_output(jsonified_data, agg_fun, output_type, n_unique):
-    if jsonified_data is not None:
-        trans_tbl = pd.read_json(jsonified_data, orient="split")
-
-        f_output = mba_fun.product_quantity(df=trans_tbl, agg_function=agg_fun, output_type=output_type,
-                                            max_unique_value=n_unique)
+def update_product_quantity_output(data_key, agg_fun, output_type, n_unique):
+    artifacts = dataset_artifacts(data_key)
 
+    if artifacts is not None:
         if output_type == "plot":
+            def create_figure():
+                return mba_fun.product_quantity(df=None, agg_function=agg_fun, output_type="plot",
+                                                max_unique_value=n_unique, cube=artifacts["cube"])
+
+            f_output = server_cache.cached_figure(data_key, "product_quantity", (agg_fun, n_unique), create_figure)
             return comp_fun.create_graph(f_output)
         elif output_type == "table":
-            return comp_fun.create_dataframe(df=f_output, page_size=13)
+            f_output = mba_fun.product_quantity(df=None, agg_function=agg_fun, output_type="table",
+                                                cube=artifacts["cube"])
+            return create_server_dataframe(df=f_output, page_size=13, file_name="product_quantity",
+                                           sort_by=f_output.columns[1])
     else:
         return dash.no_update
 
 
 @app.callback(
     Output("product_purchase_output", "children"),
-    Input("store_data", "data"),
+    Input("store_data_key", "data"),
     Input("purchase_product_output_type", "value"),
     Input("purchase_product_nunique", "value"),
 )
-def update_product_purchase_output(jsonified_data, output_type, n_unique):
-    if jsonified_data is not None:
-        trans_tbl = pd.read_json(jsonified_data, orient="split")
-
-        f_output = mba_fun.most_purchased_products(df=trans_tbl, output_type=output_type, max_unique_value=n_unique)
+def update_product_purchase_output(data_key, output_type, n_unique):
+    artifacts = dataset_artifacts(data_key)
 
+    if artifacts is not None:
         if output_type == "plot":
+            def create_figure():
+                return mba_fun.most_purchased_products(df=None, output_type="plot", max_unique_value=n_unique,
+                                                       cube=artifacts["cube"])
+
+            f_output = server_cache.cached_figure(data_key, "most_purchased_products", (n_unique,), create_figure)
             return comp_fun.create_graph(f_output)
         elif output_type == "table":
-            return comp_fun.create_dataframe(df=f_output, page_size=13)
+            f_output = mba_fun.most_purchased_products(df=None, output_type="table", cube=artifacts["cube"])
+            return create_server_dataframe(df=f_output, page_size=13, file_name="most_purchased_products",
+                                           sort_by="Count")
     else:
         return dash.no_update
 
 
 @app.callback(
     Output("product_profitability_output", "children"),
-    Input("store_data", "data"),
+    Input("store_data_key", "data"),
     Input("profitable_product_agg", "value"),
     Input("profitable_product_output_type", "value"),
     Input("profitable_product_nunique", "value"),
 )
-def update_product_profitability_output(jsonified_data, agg_fun, output_type, n_unique):
-    if jsonified_data is not None:
-        trans_tbl = pd.read_json(jsonified_data, orient="split")
-
-        f_output = mba_fun.most_profitable_product(df=trans_tbl, agg_function=agg_fun, output_type=output_type,
-                                                   max_unique_value=n_unique)
+def update_product_profitability_output(data_key, agg_fun, output_type, n_unique):
+    artifacts = dataset_artifacts(data_key)
 
+    if artifacts is not None:
         if output_type == "plot":
+            def create_figure():
+                return mba_fun.most_profitable_product(df=None, agg_function=agg_fun, output_type="plot",
+                                                       max_unique_value=n_unique, cube=artifacts["cube"])
+
+            f_output = server_cache.cached_figure(data_key, "most_profitable_product", (agg_fun, n_unique),
+                                                  create_figure)
             return comp_fun.create_graph(f_output)
         elif output_type == "table":
-            return comp_fun.create_dataframe(df=f_output, page_size=15)
+            f_output = mba_fun.most_profitable_product(df=None, agg_function=agg_fun, output_type="table",
+                                                       cube=artifacts["cube"])
+            return create_server_dataframe(df=f_output, page_size=15, file_name="most_profitable_products",
+                                           sort_by=f_output.columns[1])
     else:
         return dash.no_update
 
@@ -268,6 +440,7 @@ def create_min_threshold_value(metric):
     State("rule_metric", "value"),
     State("min_threshold", "value"),
     State("mba_analysis_output_type", "value"),
+    State("prune_redundant_rules", "value"),
 )
 def create_mba_rules_set(jsonified_data,
                          n_click,
@@ -275,11 +448,12 @@ def create_mba_rules_set(jsonified_data,
                          max_len,
                          rule_metric,
                          min_threshold,
-                         mba_analysis_output_type):
+                         mba_analysis_output_type,
+                         prune_rules):
     if jsonified_data is not None:
-        trans_tbl = pd.read_json(jsonified_data, orient="split")
-
         if n_click:
+            trans_tbl = server_cache.prepare_dataset(jsonified_data)[1]["data"]
+
             mba_rules = mba_fun.create_association_rule(df=trans_tbl,
                                                         min_support=min_support,
                                                         max_length=max_len,
@@ -287,6 +461,11 @@ def create_mba_rules_set(jsonified_data,
                                                         min_threshold=min_threshold,
                                                         output_type=mba_analysis_output_type)
 
+            n_rules = mba_rules.shape[0]
+
+            if prune_rules and mba_analysis_output_type == "rules":
+                mba_rules = mba_fun.prune_redundant_rules(df=mba_rules)
+
             description = mba_fun.metric_description(df=mba_rules, return_type=mba_analysis_output_type)
 
             if mba_analysis_output_type == "rules":
@@ -302,14 +481,28 @@ def create_mba_rules_set(jsonified_data,
                                                             rule_metric=rule_metric,
                                                             min_threshold=min_threshold,
                                                             output_type="rules")
+                n_rules = mba_rules.shape[0]
+
+                if prune_rules:
+                    mba_rules = mba_fun.prune_redundant_rules(df=mba_rules)
+
+            # The itemset output is not pruned, only the rules kept for filtering are ------------------------------|
+            if prune_rules and mba_analysis_output_type == "rules":
+                description["n_pruned"] = n_rules - mba_rules.shape[0]
+
+            jsonified_rule_data = mba_rules.to_json(date_format="iso", orient="split")
+
+            # Index the rule set as it is stored, so filtering starts from prepared rules ----------------|
+            rule_key = server_cache.prepare_rules(jsonified_rule_data)[0]
 
-            child_output = comp_fun.create_dataframe(df=mba_rules_out, page_size=14, precision=4)
+            child_output = create_server_dataframe(df=mba_rules_out, page_size=14, precision=4,
+                                                   file_name="association_rules", rule_set_key=rule_key)
 
             desc_output = comp_fun.create_description_table(m_dict=description,
                                                             return_type=mba_analysis_output_type,
                                                             return_name="Analysis")
 
-            return child_output, desc_output, mba_rules.to_json(date_format="iso", orient="split")
+            return child_output, desc_output, jsonified_rule_data
         else:
             return dash.no_update, dash.no_update, dash.no_update  # raise dash.exceptions.PreventUpdate
     else:
@@ -318,16 +511,16 @@ def create_mba_rules_set(jsonified_data,
 
 @app.callback(Output("jq_f_product_type", "options"),
               Output("jq_s_product_type", "options"),
-              Input("store_data", "data"), )
-def update_unique_products(jsonified_data):
-    if jsonified_data is not None:
-        trans_tbl = pd.read_json(jsonified_data, orient="split")
+              Input("store_data_key", "data"), )
+def update_unique_products(data_key):
+    artifacts = dataset_artifacts(data_key)
 
-        unique_products = mba_fun.unique_products(df=trans_tbl)
+    if artifacts is not None:
+        unique_products = artifacts["products"]
 
         return unique_products, unique_products
     else:
-        dash.no_update, dash.no_update
+        return dash.no_update, dash.no_update
 
 
 @app.callback(
@@ -368,6 +561,18 @@ def disable_srule_type(opts):
     return comp_fun.disable_fs_rule_type(opts, typ="single")
 
 
+@app.callback(
+    Output("jq_length_count", "children"),
+    Output("jq_length_products", "max"),
+    Input("store_rule_data", "data"),
+    Input("jq_len_rule_metric_type", "value"),
+    Input("jq_rule_length_comp_opt", "value"),
+    Input("jq_length_products", "value"),
+)
+def update_jq_length_count(jsonified_rule_data, rule_type, comp_op, length):
+    return rule_length_count(jsonified_rule_data, rule_type, comp_op, length)
+
+
 @app.callback(
     Output("mba_query_output", "children"),
     Output("mba_query_table_description", "children"),
@@ -392,63 +597,32 @@ def disable_srule_type(opts):
     State("jq_len_rule_metric_type", "value"),
     State("jq_rule_length_comp_opt", "value"),
     State("jq_length_products", "value"),
+
+    State("jq_combine_filters", "value"),
 )
 def filter_view_rules(jsonified_data, ct_click, ct_f_rule_type, ct_f_product_type, ct_bitwise_opt, ct_s_rule_type,
                       ct_s_product_type, ct_search_type,
                       q_matric_click, q_matric_input_label, q_matric_input, q_matric_comp_opt, q_matric_bitwise_opt,
-                      len_click, len_matric_type, len_comp_opt, len_n_product, ):
-    if jsonified_data is not None:
-        trans_tbl = pd.read_json(jsonified_data, orient="split")
-        trans_tbl = mba_fun.freeze_set(trans_tbl)
-
-        if ctx.triggered_id is not None:
-            button_id = ctx.triggered_id
-
-            if ct_click and button_id == "jq_filter_rule_contain_products":
-                filtered_rules = mba_fun.filter_products_contain(df=trans_tbl,
-                                                                 search_type=ct_search_type,
-                                                                 f_rule_type=ct_f_rule_type,
-                                                                 f_product_type=ct_f_product_type,
-                                                                 s_rule_type=ct_s_rule_type,
-                                                                 s_product_type=ct_s_product_type,
-                                                                 bitwise_opt=ct_bitwise_opt)
-
-            elif q_matric_click and button_id == "jq_filter_rule_query_metrics":
-                cleaned_values = mba_fun.get_query_values(metric=q_matric_input_label,
-                                                          metric_value=q_matric_input,
-                                                          comp_op=q_matric_comp_opt,
-                                                          bitw_op=q_matric_bitwise_opt)
-
-                filtered_rules = mba_fun.filter_rules_values(df=trans_tbl,
-                                                             query_values=cleaned_values[0],
-                                                             comp_op=cleaned_values[1],
-                                                             bitw_op=cleaned_values[2])
-
-            elif len_click and button_id == "jq_filter_rule_rule_length":
-                filtered_rules = mba_fun.filter_rules_length(df=trans_tbl,
-                                                             rule_type=len_matric_type,
-                                                             comp_op=len_comp_opt,
-                                                             length=len_n_product)
-
-            try:
-                if button_id in ["jq_filter_rule_contain_products",
-                                 "jq_filter_rule_query_metrics",
-                                 "jq_filter_rule_rule_length"]:
-                    description = mba_fun.metric_description(df=filtered_rules, return_type="rules")
-
-                    unfreez_filtered_rules = mba_fun.str_frozenset(df=filtered_rules)
-
-                    filtered_output = comp_fun.create_dataframe(df=unfreez_filtered_rules, page_size=14, precision=4)
-
-                    desc_output = comp_fun.create_description_table(m_dict=description,
-                                                                    return_type="rules",
-                                                                    return_name="Filtered Data")
-
-                    return filtered_output, desc_output
-                else:
-                    return dash.no_update, dash.no_update
-            except:
-                return dash.no_update, dash.no_update
+                      len_click, len_matric_type, len_comp_opt, len_n_product, combine_filters):
+    button_clicks = {"jq_filter_rule_contain_products": ct_click,
+                     "jq_filter_rule_query_metrics": q_matric_click,
+                     "jq_filter_rule_rule_length": len_click}
+
+    if jsonified_data is not None and button_clicks.get(ctx.triggered_id):
+        try:
+            filtered_output, desc_output, _ = filter_rule_output(
+                jsonified_rule_data=jsonified_data,
+                button_id=ctx.triggered_id,
+                combine_filters=combine_filters,
+                contain_values=[ct_f_rule_type, ct_f_product_type, ct_bitwise_opt, ct_s_rule_type, ct_s_product_type,
+                                ct_search_type],
+                metric_values=[q_matric_input_label, q_matric_input, q_matric_comp_opt, q_matric_bitwise_opt],
+                length_values=[len_matric_type, len_comp_opt, len_n_product]
+            )
+
+            return filtered_output, desc_output
+        except:
+            return dash.no_update, dash.no_update
     else:
         return dash.no_update, dash.no_update
 
@@ -480,31 +654,60 @@ def disable_variable_option(x_var, y_var):
 )
 def update_rel_plot(jsonified_data, plt_click, x_var, y_var, z_var, opacity):
     if jsonified_data is not None:
-        trans_tbl = pd.read_json(jsonified_data, orient="split")
-        trans_tbl = mba_fun.freeze_set(trans_tbl)
-
         if plt_click:
-            rel_output = mba_fun.rules_relationship(df=trans_tbl, x_var=x_var, y_var=y_var, z_var=z_var,
-                                                    opacity=opacity)
+            rule_key = server_cache.dataset_key(jsonified_data)
+
+            def create_rel_plot():
+                trans_tbl = server_cache.prepare_rules(jsonified_data, data_key=rule_key)[1]["rules"]
 
-            return comp_fun.create_graph(rel_output)
+                return mba_fun.rules_relationship(df=trans_tbl, x_var=x_var, y_var=y_var, z_var=z_var,
+                                                  opacity=opacity)
+
+            rel_output = server_cache.cached_figure(rule_key, "rules_relationship", (x_var, y_var, z_var, opacity),
+                                                    create_rel_plot)
+
+            return comp_fun.create_graph(rel_output, graph_id="rel_graph")
         else:
             return dash.no_update
     else:
         return dash.no_update
 
 
+@app.callback(
+    Output("rel_graph", "figure"),
+    Input("rel_graph", "relayoutData"),
+    State("rel_graph", "figure"),
+    State("store_rule_data", "data"),
+    prevent_initial_call=True,
+)
+def rebin_rel_plot(relayout_data, figure, jsonified_data):
+    plot_vars = figure["layout"].get("meta") if figure is not None else None
+
+    if not relayout_data or not isinstance(plot_vars, dict) or jsonified_data is None:
+        return dash.no_update
+
+    ranges = zoom_ranges(relayout_data, figure["layout"])
+
+    if ranges is None:
+        return dash.no_update
+
+    trans_tbl = server_cache.prepare_rules(jsonified_data)[1]["rules"]
+
+    return mba_fun.rules_relationship(df=trans_tbl, x_var=plot_vars["x_var"], y_var=plot_vars["y_var"],
+                                      z_var=plot_vars["z_var"], x_range=ranges[0], y_range=ranges[1])
+
+
 @app.callback(Output("gl_f_product_type", "options"), Output("gl_s_product_type", "options"),
-              Input("store_data", "data"), )
-def update_unique_products(jsonified_data):
-    if jsonified_data is not None:
-        trans_tbl = pd.read_json(jsonified_data, orient="split")
+              Input("store_data_key", "data"), )
+def update_unique_products(data_key):
+    artifacts = dataset_artifacts(data_key)
 
-        unique_products = mba_fun.unique_products(df=trans_tbl)
+    if artifacts is not None:
+        unique_products = artifacts["products"]
 
         return unique_products, unique_products
     else:
-        dash.no_update, dash.no_update
+        return dash.no_update, dash.no_update
 
 
 @app.callback(
@@ -545,6 +748,18 @@ def disable_srule_type(opts):
     return comp_fun.disable_fs_rule_type(opts, typ="single")
 
 
+@app.callback(
+    Output("gl_length_count", "children"),
+    Output("gl_length_products", "max"),
+    Input("store_rule_data", "data"),
+    Input("gl_len_rule_metric_type", "value"),
+    Input("gl_rule_length_comp_opt", "value"),
+    Input("gl_length_products", "value"),
+)
+def update_gl_length_count(jsonified_rule_data, rule_type, comp_op, length):
+    return rule_length_count(jsonified_rule_data, rule_type, comp_op, length)
+
+
 @app.callback(
     Output("filtered_rules_for_extraction", "children"),
     Output("mba_filtered_rules_table_description", "children"),
@@ -570,60 +785,33 @@ def disable_srule_type(opts):
     State("gl_len_rule_metric_type", "value"),
     State("gl_rule_length_comp_opt", "value"),
     State("gl_length_products", "value"),
+
+    State("gl_combine_filters", "value"),
 )
 def filter_rules(jsonified_rule_data,
                  ct_click, ct_f_rule_type, ct_f_product_type, ct_bitwise_opt, ct_s_rule_type, ct_s_product_type,
                  ct_search_type,
                  q_matric_click, q_matric_input_label, q_matric_input, q_matric_comp_opt, q_matric_bitwise_opt,
-                 len_click, len_matric_type, len_comp_opt, len_n_product):
-    if jsonified_rule_data is not None:
-        trans_rule_tbl = pd.read_json(jsonified_rule_data, orient="split")
-        trans_rule_tbl = mba_fun.freeze_set(trans_rule_tbl)
-
-        if ctx.triggered_id is not None:
-            button_id = ctx.triggered_id
-
-            if ct_click and button_id == "gl_filter_rule_contain_products":
-                filtered_rules = mba_fun.filter_products_contain(df=trans_rule_tbl,
-                                                                 search_type=ct_search_type,
-                                                                 f_rule_type=ct_f_rule_type,
-                                                                 f_product_type=ct_f_product_type,
-                                                                 s_rule_type=ct_s_rule_type,
-                                                                 s_product_type=ct_s_product_type,
-                                                                 bitwise_opt=ct_bitwise_opt)
-
-            elif q_matric_click and button_id == "gl_filter_rule_query_metrics":
-                cleaned_values = mba_fun.get_query_values(metric=q_matric_input_label,
-                                                          metric_value=q_matric_input,
-                                                          comp_op=q_matric_comp_opt,
-                                                          bitw_op=q_matric_bitwise_opt)
-
-                filtered_rules = mba_fun.filter_rules_values(df=trans_rule_tbl,
-                                                             query_values=cleaned_values[0],
-                                                             comp_op=cleaned_values[1],
-                                                             bitw_op=cleaned_values[2])
-
-            elif len_click and button_id == "gl_filter_rule_rule_length":
-                filtered_rules = mba_fun.filter_rules_length(df=trans_rule_tbl,
-                                                             rule_type=len_matric_type,
-                                                             comp_op=len_comp_opt,
-                                                             length=len_n_product)
-
-            try:
-                if button_id in ["gl_filter_rule_contain_products", "gl_filter_rule_query_metrics",
-                                 "gl_filter_rule_rule_length"]:
-                    description = mba_fun.metric_description(df=filtered_rules, return_type="rules")
-                    unfreez_filtered_rules = mba_fun.str_frozenset(df=filtered_rules)
-
-                    filtered_output = comp_fun.create_dataframe(df=unfreez_filtered_rules, page_size=14, precision=4)
-                    desc_output = comp_fun.create_description_table(m_dict=description, return_type="rules",
-                                                                    return_name="Filtered Data")
-
-                    return filtered_output, desc_output, filtered_rules.to_json(date_format="iso", orient="split")
-                else:
-                    return dash.no_update, dash.no_update, dash.no_update
-            except:
-                return dash.no_update, dash.no_update, dash.no_update
+                 len_click, len_matric_type, len_comp_opt, len_n_product, combine_filters):
+    button_clicks = {"gl_filter_rule_contain_products": ct_click,
+                     "gl_filter_rule_query_metrics": q_matric_click,
+                     "gl_filter_rule_rule_length": len_click}
+
+    if jsonified_rule_data is not None and button_clicks.get(ctx.triggered_id):
+        try:
+            filtered_output, desc_output, filtered_rules = filter_rule_output(
+                jsonified_rule_data=jsonified_rule_data,
+                button_id=ctx.triggered_id,
+                combine_filters=combine_filters,
+                contain_values=[ct_f_rule_type, ct_f_product_type, ct_bitwise_opt, ct_s_rule_type, ct_s_product_type,
+                                ct_search_type],
+                metric_values=[q_matric_input_label, q_matric_input, q_matric_comp_opt, q_matric_bitwise_opt],
+                length_values=[len_matric_type, len_comp_opt, len_n_product]
+            )
+
+            return filtered_output, desc_output, filtered_rules.to_json(date_format="iso", orient="split")
+        except:
+            return dash.no_update, dash.no_update, dash.no_update
     else:
         return dash.no_update, dash.no_update, dash.no_update
 
@@ -643,11 +831,12 @@ def filter_rules(jsonified_rule_data,
 def create_likely_purchase_products(jsonified_data, rule_jsonified_data, filter_rule_jsonified_data,
                                     likely_click, range_rules, arrangement, just_id):
     if jsonified_data is not None and rule_jsonified_data is not None:
-        trans_tbl = pd.read_json(jsonified_data, orient="split")
-        rule_tbl = pd.read_json(rule_jsonified_data, orient="split")
+        data_artifacts = server_cache.prepare_dataset(jsonified_data)[1]
+        trans_tbl = data_artifacts["data"]
+        rule_tbl = server_cache.read_json(rule_jsonified_data, orient="split")
 
         if filter_rule_jsonified_data is not None:
-            selected_rule_tbl = pd.read_json(filter_rule_jsonified_data, orient="split")
+            selected_rule_tbl = server_cache.read_json(filter_rule_jsonified_data, orient="split")
         else:
             selected_rule_tbl = rule_tbl
 
@@ -669,9 +858,149 @@ def create_likely_purchase_products(jsonified_data, rule_jsonified_data, filter_
                                                                         ant_products=ant_products,
                                                                         con_products=con_products,
                                                                         just_customer_id=just_id,
-                                                                        distinct_product_group=arrangement)
+                                                                        distinct_product_group=arrangement,
+                                                                        customer_items=data_artifacts["customer_items"])
+
+            return create_server_dataframe(df=likely_product_output, page_size=14, precision=1,
+                                           file_name="likely_purchase_products")
+
+
+@app.callback(
+    Output("recommended_products_output", "children"),
+
+    Input("create_recommended_products", "n_clicks"),
+    State("store_data", "data"),
+    State("store_rule_data", "data"),
+    State("n_recommended_products", "value"),
+    State("recommend_rule_metric", "value"),
+    prevent_initial_call=True,
+)
+def create_recommended_products(recommend_click, jsonified_data, rule_jsonified_data, n_products, rule_metric):
+    if recommend_click and jsonified_data is not None and rule_jsonified_data is not None and n_products:
+        data_artifacts = server_cache.prepare_dataset(jsonified_data)[1]
+        rule_tbl = server_cache.prepare_rules(rule_jsonified_data)[1]["rules"]
+
+        recommended_products = mba_fun.recommend_products(df=data_artifacts["data"],
+                                                          rules=rule_tbl,
+                                                          k=n_products,
+                                                          metric=rule_metric,
+                                                          customer_items=data_artifacts["customer_items"])
+
+        return create_server_dataframe(df=recommended_products, page_size=14, precision=4,
+                                       file_name="recommended_products")
+    else:
+        return dash.no_update
+
+
+# API ==================================================================================================================
+@server.route("/api/rule-sets", methods=["GET"])
+def rule_sets_api():
+    rule_sets = []
+
+    for rule_key in reversed(server_cache.rule_cache.keys()):
+        rule_artifacts = server_cache.rule_cache.get(rule_key)
+
+        if rule_artifacts is not None:
+            rule_sets.append({"rule_set": rule_key, "n_rules": int(rule_artifacts["rules"].shape[0])})
+
+    return jsonify({"rule_sets": rule_sets})
+
+
+@server.route("/api/rule-sets/<rule_key>.json", methods=["GET"])
+def rule_set_api(rule_key):
+    """
+    Download a rule set as stored by the app, a rule table serialized by `to_json` with orient 'split', which
+    batch_score.py reads with --rules.
+    """
+    rule_artifacts = server_cache.rule_cache.get(rule_key)
+
+    if rule_artifacts is None:
+        return jsonify({"error": "rule set not found, it is no longer cached or was created by another server worker, "
+                                 "create the rules again in the Market Basket Analysis page."}), 404
+
+    return Response(rule_artifacts["rules"].to_json(date_format="iso", orient="split"), mimetype="application/json",
+                    headers={"Content-Disposition": f"attachment; filename=rules-{rule_key}.json"})
+
+
+@server.route("/api/recommend", methods=["POST"])
+def recommend_api():
+    """
+    Recommend products for a basket from a stored rule set. The JSON body holds the basket 'products', the 'rule_set'
+    key listed by /api/rule-sets and optionally 'k' and the ranking 'metric'.
+
+    Rule sets are held in the memory of the server process that created them, so with several server workers a rule
+    set is only found by the worker that served the Market Basket Analysis page.
+    """
+    payload = request.get_json(silent=True) or {}
+    products = payload.get("products")
+    rule_key = payload.get("rule_set")
+
+    if not isinstance(products, list) or not all(isinstance(p, str) for p in products):
+        return jsonify({"error": "`products` must be a list of product names."}), 400
+
+    if not isinstance(rule_key, str):
+        return jsonify({"error": "`rule_set` must be a rule set key listed by /api/rule-sets."}), 400
+
+    basket_rules = server_cache.prepare_basket_rules(rule_key)
+
+    if basket_rules is None:
+        return jsonify({"error": "rule set not found, it is no longer cached or was created by another server worker, "
+                                 "create the rules again in the Market Basket Analysis page."}), 404
+
+    try:
+        recommendations = mba_fun.recommend_basket(basket_rules=basket_rules,
+                                                   products=products,
+                                                   k=int(payload.get("k", 10)),
+                                                   metric=payload.get("metric", "lift"))
+    except (TypeError, ValueError) as error:
+        return jsonify({"error": str(error)}), 400
+
+    return jsonify({"rule_set": rule_key, "products": products, "recommendations": recommendations})
+
+
+@server.route("/api/results/<handle>.<output_format>", methods=["GET"])
+def download_result_api(handle, output_format):
+    """
+    Stream a result displayed in a server side paged table as CSV chunks or Parquet row groups.
+
+    Results are held in the memory of the server process that created them, so with several server workers a download
+    is only found by the worker that served the table, e.g. behind sticky sessions, and a restart expires every result.
+    """
+    try:
+        chunks = server_cache.result_chunks(handle=handle, output_format=output_format)
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 404
+    except ImportError:
+        return jsonify({"error": "Parquet export requires pyarrow, download the result as CSV instead."}), 501
+
+    if chunks is None:
+        return jsonify({"error": "result not found, it is no longer cached or was created by another server worker, "
+                                 "create it again."}), 404
+
+    return Response(chunks,
+                    mimetype="text/csv" if output_format == "csv" else "application/vnd.apache.parquet",
+                    headers={"Content-Disposition": f"attachment; filename={handle}.{output_format}"})
+
+
+@server.after_request
+def record_callback_payload(response):
+    if request.path.endswith("/_dash-update-component") and not response.is_streamed:
+        output = (request.get_json(silent=True) or {}).get("output")
+
+        if output in app.callback_map:
+            instrument.record_payload(stage=f"callback.{output}",
+                                      input_bytes=request.content_length or 0,
+                                      output_bytes=response.calculate_content_length() or 0)
+
+    return response
+
 
-            return comp_fun.create_dataframe(df=likely_product_output, page_size=14, precision=1)
+@server.route("/metrics", methods=["GET"])
+def metrics_api():
+    """
+    The wall time, payload bytes and peak memory of the callbacks and heavy functions, in the Prometheus format.
+    """
+    return Response(instrument.metrics_text(), mimetype="text/plain; version=0.0.4")
 
 
 if __name__ == "__main__":
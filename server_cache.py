@@ -0,0 +1,448 @@
+from collections import OrderedDict
+from hashlib import blake2b
+from itertools import combinations
+from json import loads
+from threading import Lock
+from uuid import uuid4
+
+from pandas import read_json
+from pandas.api.types import is_numeric_dtype
+
+import function as mba_fun
+from instrument import instrument
+
+read_json = instrument(stage="pandas.read_json")(read_json)
+
+
+class LRUCache:
+    """
+    A thread safe least recently used cache. Keys are either a dataset key or a tuple that starts with the
+    dataset key, so every value derived from a dataset can be dropped with `invalidate`. `on_evict` is called
+    with the key of every entry dropped for space.
+    """
+
+    def __init__(self, maxsize: int = 32, on_evict=None):
+        self.maxsize = maxsize
+        self.on_evict = on_evict
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def keys(self):
+        """
+        The cached keys, from the least to the most recently used.
+        """
+        with self._lock:
+            return list(self._data.keys())
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        evicted = []
+
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.maxsize:
+                evicted.append(self._data.popitem(last=False)[0])
+
+        if self.on_evict is not None:
+            for evicted_key in evicted:
+                self.on_evict(evicted_key)
+
+        return value
+
+    def invalidate(self, data_key: str):
+        with self._lock:
+            for key in [k for k in self._data if k == data_key or (isinstance(k, tuple) and k[0] == data_key)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def dataset_key(jsonified_data: str):
+    """
+    parameter
+    ---------
+    jsonified_data: A dataframe serialized by `to_json`, as held in a dcc.Store.
+
+    return
+    ------
+    A string that identifies the content of the data.
+    """
+    return blake2b(jsonified_data.encode("utf-8"), digest_size=16).hexdigest()
+
+
+figure_cache = LRUCache(maxsize=128)
+
+
+def cached_figure(data_key: str, name: str, params: tuple, create_figure):
+    """
+    parameter
+    ---------
+    data_key: The `dataset_key` of the data the figure is created from.
+    name: The name of the function creating the figure.
+    params: The parameters passed to the function.
+    create_figure: A function without arguments returning a plotly figure, called when it is not cached.
+
+    return
+    ------
+    The figure as a dictionary, which dcc.Graph accepts as a figure.
+    """
+    key = (data_key, name) + tuple(params)
+    figure_json = figure_cache.get(key)
+
+    if figure_json is None:
+        figure_json = figure_cache.set(key, create_figure().to_json())
+
+    return loads(figure_json)
+
+
+dataset_cache = LRUCache(maxsize=4, on_evict=figure_cache.invalidate)
+
+
+@instrument()
+def prepare_dataset(jsonified_data: str, data_key: str = None):
+    """
+    parameter
+    ---------
+    jsonified_data: A transaction dataframe serialized by `to_json` with orient 'split'.
+    data_key: The `dataset_key` of `jsonified_data`, it is created when not supplied.
+
+    return
+    ------
+    The dataset key and a dictionary with the parsed transaction data ('data'), the value box figures ('kpis'),
+    the product cube ('cube'), the list of unique products ('products') and the sparse customer by product matrix
+    ('customer_items'). The dictionary is created once per dataset and must not be modified.
+    """
+    if data_key is None:
+        data_key = dataset_key(jsonified_data)
+
+    artifacts = dataset_cache.get(data_key)
+
+    if artifacts is None:
+        trans_tbl = read_json(jsonified_data, orient="split")
+
+        artifacts = dataset_cache.set(data_key, {
+            "data": trans_tbl,
+            "kpis": mba_fun.create_data_summary(df=trans_tbl),
+            "cube": mba_fun.create_product_cube(df=trans_tbl),
+            "products": mba_fun.unique_products(df=trans_tbl),
+            "customer_items": mba_fun.create_customer_items(df=trans_tbl),
+        })
+
+    return data_key, artifacts
+
+
+# Results are held in the memory of the server process that created them, paging, sorting and downloading a result
+# need the requests to reach that process, e.g. a single server worker or sticky sessions ----------------------------|
+sort_cache = LRUCache(maxsize=32)
+result_cache = LRUCache(maxsize=32, on_evict=sort_cache.invalidate)
+
+
+def store_result(df):
+    """
+    parameter
+    ---------
+    df: A dataframe displayed in a server side paged table.
+
+    return
+    ------
+    The handle of `df` in the result cache.
+    """
+    handle = uuid4().hex
+    result_cache.set(handle, df)
+
+    return handle
+
+
+def result_page(handle: str, page_current: int, page_size: int, sort_by: list = None):
+    """
+    parameter
+    ---------
+    handle: The handle returned by `store_result`.
+    page_current: The page to return, starting from 0.
+    page_size: The number of rows in a page.
+    sort_by: The DataTable `sort_by` property.
+
+    return
+    ------
+    A dataframe with the rows of the requested page or None when the result is no longer cached.
+    """
+    df = result_cache.get(handle)
+
+    if df is None:
+        return None
+
+    if sort_by:
+        column = sort_by[0]["column_id"]
+        ascending = sort_by[0]["direction"] == "asc"
+
+        if is_numeric_dtype(df[column]):
+            return mba_fun.page_rows(df, column, page_current, page_size, ascending=ascending)
+
+        # Sorted copies are kept apart, so sorting a table does not evict the results of other tables ---------------:
+        sort_key = (handle, column, ascending)
+        sorted_df = sort_cache.get(sort_key)
+
+        if sorted_df is None:
+            sorted_df = sort_cache.set(sort_key, df.sort_values(column, ascending=ascending))
+
+        df = sorted_df
+
+    return df.iloc[page_current * page_size:(page_current + 1) * page_size]
+
+
+class StreamBuffer:
+    """
+    A write only file object for writers that need `tell`, the bytes written since the last `take` are returned by
+    `take` and then released.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def csv_chunks(df, chunk_size: int):
+    for start in range(0, max(df.shape[0], 1), chunk_size):
+        yield df.iloc[start:start + chunk_size].to_csv(index=False, header=start == 0).encode("utf-8")
+
+
+def parquet_chunks(df, chunk_size: int):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+
+    def chunks():
+        sink = StreamBuffer()
+
+        with pq.ParquetWriter(sink, schema) as writer:
+            for start in range(0, df.shape[0], chunk_size):
+                writer.write_table(pa.Table.from_pandas(df.iloc[start:start + chunk_size], schema=schema,
+                                                        preserve_index=False))
+                yield sink.take()
+
+        yield sink.take()
+
+    return chunks()
+
+
+def result_chunks(handle: str, output_format: str, chunk_size: int = 50_000):
+    """
+    parameter
+    ---------
+    handle: The handle returned by `store_result`.
+    output_format: Either 'csv' or 'parquet', Parquet needs pyarrow.
+    chunk_size: The number of rows in a CSV chunk or a Parquet row group.
+
+    return
+    ------
+    A generator of the bytes of the cached result in `output_format`, created `chunk_size` rows at a time so the
+    memory used does not grow with the result, or None when the result is no longer cached.
+    """
+    mba_fun.match_arg(output_format, ["csv", "parquet"])
+
+    df = result_cache.get(handle)
+
+    if df is None:
+        return None
+
+    if output_format == "csv":
+        return csv_chunks(df, chunk_size)
+    else:
+        return parquet_chunks(df, chunk_size)
+
+
+query_cache = LRUCache(maxsize=64)
+basket_cache = LRUCache(maxsize=8)
+
+
+def invalidate_rule_results(data_key: str):
+    """
+    Drop the figures, filter results and basket rules created from the rule set `data_key`.
+    """
+    figure_cache.invalidate(data_key)
+    query_cache.invalidate(data_key)
+    basket_cache.invalidate(data_key)
+
+
+# The caches are held in the memory of each server process, a rule set is only found in the process that prepared it -|
+rule_cache = LRUCache(maxsize=8, on_evict=invalidate_rule_results)
+
+
+@instrument()
+def prepare_rules(jsonified_rule_data: str, data_key: str = None):
+    """
+    parameter
+    ---------
+    jsonified_rule_data: A product association rule dataframe serialized by `to_json` with orient 'split'.
+    data_key: The `dataset_key` of `jsonified_rule_data`, it is created when not supplied.
+
+    return
+    ------
+    The rule set key and a dictionary with the rules, antecedents and consequents as frozensets ('rules'), the
+    inverted product index of the rules ('product_index'), the range of each metric ('metric_ranges'), the
+    sorted metric index ('metric_index') and the number of products in each rule ('rule_lengths'). The dictionary
+    is created once per rule set and must not be modified.
+    """
+    if data_key is None:
+        data_key = dataset_key(jsonified_rule_data)
+
+    artifacts = rule_cache.get(data_key)
+
+    if artifacts is None:
+        rules = mba_fun.freeze_set(read_json(jsonified_rule_data, orient="split"))
+
+        artifacts = rule_cache.set(data_key, {
+            "rules": rules,
+            "product_index": mba_fun.create_product_index(df=rules),
+            "metric_ranges": mba_fun.rule_metric_ranges(df=rules),
+            "metric_index": mba_fun.create_metric_index(df=rules),
+            "rule_lengths": mba_fun.create_rule_lengths(df=rules),
+        })
+
+    return data_key, artifacts
+
+
+def prepare_basket_rules(data_key: str):
+    """
+    parameter
+    ---------
+    data_key: The rule set key returned by `prepare_rules`.
+
+    return
+    ------
+    The rules of the rule set compiled for basket recommendations by `function.compile_basket_rules`, created on the
+    first request so only the rule sets used by /api/recommend are compiled, or None when the rule set is no longer
+    cached.
+    """
+    rule_artifacts = rule_cache.get(data_key)
+
+    if rule_artifacts is None:
+        return None
+
+    basket_rules = basket_cache.get(data_key)
+
+    if basket_rules is None:
+        basket_rules = basket_cache.set(data_key, mba_fun.compile_basket_rules(rules=rule_artifacts["rules"]))
+
+    return basket_rules
+
+
+def rule_query_key(rule_query: dict):
+    """
+    parameter
+    ---------
+    rule_query: Output of `function.create_rule_query`.
+
+    return
+    ------
+    A hashable form of `rule_query`, a tuple of (clause name, clause arguments) pairs ordered by the clause name.
+    The order of the selected products does not change the key, the order of the query metrics does.
+    """
+    query_key = []
+
+    for name in sorted(rule_query):
+        clause = []
+
+        for arg, value in sorted(rule_query[name].items()):
+            if arg.endswith("_product_type") and value is not None:
+                value = tuple(sorted([value] if isinstance(value, str) else value))
+            elif isinstance(value, dict):
+                value = tuple(value.items())
+            elif isinstance(value, list):
+                value = tuple(value)
+
+            clause.append((arg, value))
+
+        query_key.append((name, tuple(clause)))
+
+    return tuple(query_key)
+
+
+@instrument()
+def filter_rule_set(jsonified_rule_data: str, rule_query: dict, data_key: str = None):
+    """
+    parameter
+    ---------
+    jsonified_rule_data: A product association rule dataframe serialized by `to_json` with orient 'split'.
+    rule_query: Output of `function.create_rule_query`.
+    data_key: The `dataset_key` of `jsonified_rule_data`, it is created when not supplied.
+
+    return
+    ------
+    The rule set key and a dictionary with the positions of the rules that meet the query ('rule_ids'), the rules
+    ('rules'), the rules with the products as strings ('display') and the metric description of the rules
+    ('description'). Results are cached by rule set and query, a query that adds clauses to a cached query only
+    searches the rules of the cached result. The dictionary must not be modified.
+    """
+    data_key, artifacts = prepare_rules(jsonified_rule_data, data_key)
+    query_key = rule_query_key(rule_query)
+
+    result = query_cache.get((data_key, query_key))
+
+    if result is None:
+        rule_ids = None
+
+        for n_clause in range(len(query_key) - 1, 0, -1):
+            for sub_query_key in combinations(query_key, n_clause):
+                sub_result = query_cache.get((data_key, sub_query_key))
+
+                if sub_result is not None and (rule_ids is None or len(sub_result["rule_ids"]) < len(rule_ids)):
+                    rule_ids = sub_result["rule_ids"]
+
+        rules = artifacts["rules"]
+        rule_ids = mba_fun.rule_query_ids(df=rules,
+                                          rule_query=rule_query,
+                                          product_index=artifacts["product_index"],
+                                          metric_ranges=artifacts["metric_ranges"],
+                                          metric_index=artifacts["metric_index"],
+                                          rule_lengths=artifacts["rule_lengths"],
+                                          rule_ids=rule_ids)
+        filtered_rules = rules.iloc[rule_ids]
+
+        result = query_cache.set((data_key, query_key), {
+            "rule_ids": rule_ids,
+            "rules": filtered_rules,
+            "display": mba_fun.str_frozenset(df=filtered_rules),
+            "description": mba_fun.metric_description(df=filtered_rules, return_type="rules"),
+        })
+
+    return data_key, result
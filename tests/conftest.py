@@ -0,0 +1,46 @@
+import os
+import sys
+import warnings
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import function as mba_fun  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def transactions():
+    return pd.read_csv(os.path.join(ROOT, "demo_trans.csv")).drop(columns="Unnamed: 0")
+
+
+@pytest.fixture(scope="session")
+def sample_transactions(transactions):
+    """
+    The transactions of 1,500 demo customers, small enough to check against loops over customers and rules.
+    """
+    customers = transactions["Customer_ID"].drop_duplicates().sample(1_500, random_state=0)
+    return transactions[transactions["Customer_ID"].isin(customers)].reset_index(drop=True)
+
+
+@pytest.fixture(scope="session")
+def rules_json(transactions):
+    """
+    The rules of the demo data serialized with orient 'split', as held by the app's rule store.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        mined = mba_fun.create_association_rule(df=transactions, min_support=0.005, rule_metric="lift",
+                                                min_threshold=0.5)
+
+    return mined.to_json(date_format="iso", orient="split")
+
+
+@pytest.fixture(scope="session")
+def rules(rules_json):
+    """
+    The rules of the demo data as read from the rule store, with antecedents and consequents as frozensets.
+    """
+    return mba_fun.freeze_set(pd.read_json(rules_json, orient="split"))
@@ -0,0 +1,143 @@
+import warnings
+
+import pandas as pd
+import pytest
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore")
+    import batch_score
+    import mba_app
+    import server_cache
+
+
+@pytest.fixture(scope="module")
+def client():
+    return mba_app.server.test_client()
+
+
+@pytest.fixture(scope="module")
+def rule_key(rules_json):
+    return server_cache.prepare_rules(rules_json)[0]
+
+
+def test_recommend_returns_products_not_in_the_basket(client, rule_key):
+    response = client.post("/api/recommend", json={"products": ["margarine", "pasta"], "k": 3, "rule_set": rule_key})
+
+    assert response.status_code == 200
+    assert 0 < len(response.get_json()["recommendations"]) <= 3
+    assert all(r["product"] not in ("margarine", "pasta") for r in response.get_json()["recommendations"])
+
+
+@pytest.mark.parametrize("k", [0, -1, "many"])
+def test_recommend_rejects_an_invalid_k(client, rule_key, k):
+    response = client.post("/api/recommend", json={"products": ["margarine"], "k": k, "rule_set": rule_key})
+
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("rule_set", [None, 1, "unknown"])
+def test_recommend_requires_a_cached_rule_set(client, rule_key, rule_set):
+    payload = {"products": ["margarine"]} if rule_set is None else {"products": ["margarine"], "rule_set": rule_set}
+    response = client.post("/api/recommend", json=payload)
+
+    assert response.status_code == (404 if rule_set == "unknown" else 400)
+
+
+def test_basket_rules_are_compiled_on_the_first_recommendation(client, rules_json):
+    rule_key = server_cache.prepare_rules(rules_json)[0]
+    server_cache.basket_cache.invalidate(rule_key)
+
+    assert rule_key not in server_cache.basket_cache
+
+    client.post("/api/recommend", json={"products": ["margarine"], "rule_set": rule_key})
+
+    assert rule_key in server_cache.basket_cache
+
+
+def test_server_dataframe_keeps_the_cached_column_names(rules_json):
+    rule_key = server_cache.prepare_rules(rules_json)[0]
+    query = mba_app.mba_fun.create_rule_query(length={"rule_type": "antecedents", "comp_op": ">=", "length": 2})
+    display = server_cache.filter_rule_set(rules_json, query, data_key=rule_key)[1]["display"]
+    columns = display.columns.to_list()
+
+    mba_app.create_server_dataframe(display)
+
+    assert display.columns.to_list() == columns
+
+
+def test_expired_server_table_shows_a_message():
+    data, message = mba_app.update_server_table_page(0, 10, None, {"type": "server_table", "index": "expired"})
+
+    assert data is mba_app.dash.no_update
+    assert "expired" in message
+
+
+def test_download_streams_the_cached_result(client):
+    df = pd.DataFrame({"product": ["a", "b"], "lift": [1.5, 2.0]})
+    handle = server_cache.store_result(df)
+
+    assert client.get(f"/api/results/{handle}.csv").get_data() == df.to_csv(index=False).encode("utf-8")
+    assert client.get("/api/results/expired.csv").status_code == 404
+    assert client.get(f"/api/results/{handle}.xlsx").status_code == 404
+
+
+def test_downloaded_rule_set_is_read_by_batch_score(client, rule_key, rules, tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_bytes(client.get(f"/api/rule-sets/{rule_key}.json").get_data())
+
+    pd.testing.assert_frame_equal(batch_score.read_rules(path), rules)
+    assert client.get("/api/rule-sets/unknown.json").status_code == 404
+
+
+def test_rule_table_links_the_rule_set_download(rule_key):
+    table = mba_app.create_server_dataframe(df=pd.DataFrame({"lift": [1.0]}), rule_set_key=rule_key)
+    hrefs = [link.href for link in table.children[0].children[1:]]
+
+    assert f"/api/rule-sets/{rule_key}.json" in hrefs
+
+
+def test_demo_transactions_are_copied_for_each_caller():
+    demo = mba_app.demo_transactions()
+    demo["Product"] = "changed"
+
+    assert (mba_app.demo_transactions()["Product"] != "changed").all()
+
+
+def test_itemset_description_does_not_report_pruned_rules():
+    description = {"n_itemsets": 10, "support": (0.1, 0.2), "length": (1, 2), "n_pruned": 3}
+
+    assert "redundant" not in mba_app.comp_fun.create_description_table(description, "sup_len", "Analysis")
+
+
+@pytest.mark.parametrize("relayout_data, expected", [
+    ({"xaxis.range[0]": 1.5, "xaxis.range[1]": 2.5}, ([1.5, 2.5], [0.2, 0.4])),
+    ({"yaxis.range": [0.25, 0.3]}, ([1.0, 3.0], [0.25, 0.3])),
+    ({"xaxis.autorange": True, "yaxis.autorange": True}, (None, None)),
+    ({"xaxis.range[0]": 1.5, "xaxis.range[1]": 2.5, "yaxis.autorange": True}, ([1.5, 2.5], None)),
+    ({"dragmode": "pan"}, None),
+])
+def test_zoom_keeps_the_range_of_the_other_axis(relayout_data, expected):
+    layout = {"xaxis": {"range": [1.0, 3.0]}, "yaxis": {"range": [0.2, 0.4]}}
+
+    assert mba_app.zoom_ranges(relayout_data, layout) == expected
+
+
+def test_dashboard_callbacks_read_the_dataset_by_key(transactions):
+    data_key = mba_app.prepare_data_artifacts(transactions.to_json(date_format="iso", orient="split"))
+    dataset_callbacks = [callback for callback in mba_app.app.callback_map.values()
+                         if {"id": "store_data_key", "property": "data"} in callback["inputs"]]
+
+    assert len(dataset_callbacks) == 6
+    assert all(state["id"] != "store_data" for callback in dataset_callbacks for state in callback["state"])
+    assert mba_app.update_product_purchase_output(data_key, "plot", 10) is not mba_app.dash.no_update
+    assert mba_app.update_product_purchase_output("evicted", "plot", 10) is mba_app.dash.no_update
+
+
+def test_dashboard_tables_send_the_top_page_by_the_server(transactions):
+    data_key = mba_app.prepare_data_artifacts(transactions.to_json(date_format="iso", orient="split"))
+    table = mba_app.update_product_purchase_output(data_key, "table", 10).children[1]
+    expected = transactions["Product"].value_counts().iloc[0:13]
+
+    assert table.id["type"] == "server_table"
+    assert table.sort_by == [{"column_id": "Count", "direction": "desc"}]
+    assert [row["Count"] for row in table.data] == expected.to_list()
@@ -0,0 +1,33 @@
+import pandas as pd
+import pytest
+
+import batch_score
+import function as mba_fun
+
+
+@pytest.mark.parametrize("n_customers", [1, 10, 11, 12])
+@pytest.mark.parametrize("partition_size", [1, 3, 5, 10, 11, 20])
+def test_customer_partitions_cover_every_customer_once(n_customers, partition_size):
+    df = pd.DataFrame({"Customer_ID": [c for c in range(n_customers) for _ in range(c % 3 + 1)]})
+    df["Product"] = "bread"
+
+    partitions = list(batch_score.customer_partitions(df.sample(frac=1, random_state=0), partition_size))
+    customers = [c for partition in partitions for c in partition["Customer_ID"].unique()]
+
+    assert sorted(customers) == list(range(n_customers))
+    assert sum(partition.shape[0] for partition in partitions) == df.shape[0]
+    assert all(partition["Customer_ID"].nunique() <= partition_size for partition in partitions)
+
+
+@pytest.mark.parametrize("partition_size", [1_000, 4_999])
+def test_partitioned_scores_match_a_full_run(transactions, rules, partition_size):
+    recommend_rules = mba_fun.compile_recommend_rules(rules=rules, metric="lift")
+
+    full = mba_fun.recommend_products(df=transactions, k=5, recommend_rules=recommend_rules)
+    partitioned = pd.concat([
+        mba_fun.recommend_products(df=partition, k=5, recommend_rules=recommend_rules)
+        for partition in batch_score.customer_partitions(transactions, partition_size)
+    ], ignore_index=True)
+
+    assert partitioned["Customer_ID"].drop_duplicates().is_monotonic_increasing
+    pd.testing.assert_frame_equal(partitioned, full.reset_index(drop=True))
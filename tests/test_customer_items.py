@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+import function as mba_fun
+
+PRODUCT_SETS = [["margarine"], ["margarine", "pasta"], ["pasta", "spices", "butter"], "berries", ["not a product"]]
+
+
+def test_customer_matrix_matches_the_transactions(sample_transactions):
+    customer_items = mba_fun.create_customer_items(df=sample_transactions)
+    matrix = pd.crosstab(sample_transactions["Customer_ID"], sample_transactions["Product"]).clip(upper=1)
+
+    assert np.array_equal(customer_items["customers"], matrix.index)
+    assert np.array_equal(customer_items["products"], matrix.columns)
+    assert np.array_equal(customer_items["matrix"].toarray(), matrix.to_numpy())
+
+
+def test_customers_with_products_match_a_groupby(sample_transactions):
+    customer_items = mba_fun.create_customer_items(df=sample_transactions)
+    baskets = sample_transactions.groupby("Customer_ID")["Product"].agg(set)
+
+    for products in PRODUCT_SETS:
+        selected = {products} if isinstance(products, str) else set(products)
+        expected = baskets.index[baskets.map(lambda basket: selected <= basket)].to_numpy()
+        customers = customer_items["customers"][mba_fun.customers_with_products(customer_items, products)]
+
+        assert np.array_equal(customers, expected)
+
+
+def test_customer_product_rows_match_a_filter(sample_transactions):
+    customer_items = mba_fun.create_customer_items(df=sample_transactions)
+    customers = np.arange(0, len(customer_items["customers"]), 7)
+
+    for products in PRODUCT_SETS:
+        selected = [products] if isinstance(products, str) else products
+        expected = np.flatnonzero(sample_transactions["Customer_ID"].isin(customer_items["customers"][customers]) &
+                                  sample_transactions["Product"].isin(selected))
+
+        assert np.array_equal(mba_fun.customer_product_rows(customer_items, customers, products), expected)
+
+
+def test_bulk_customer_products_match_each_rule(sample_transactions, rules):
+    selected = rules.iloc[::20]
+    ant_products = [sorted(ant) for ant in selected["antecedents"]]
+    con_products = [sorted(con) for con in selected["consequents"]]
+
+    bulk = mba_fun.bulk_protential_customer_product(df=sample_transactions, ant_products=ant_products,
+                                                    con_products=con_products)
+
+    per_rule = pd.concat([
+        mba_fun.get_protential_customer_product(df=sample_transactions, ant_products=ant, con_products=con)
+        for ant, con in zip(ant_products, con_products)
+    ])
+
+    pd.testing.assert_frame_equal(bulk.reset_index(drop=True), per_rule.reset_index(drop=True), check_like=True)
+
+
+def test_bulk_customer_ids_match_each_rule(sample_transactions, rules):
+    selected = rules.iloc[::20]
+    ant_products = [sorted(ant) for ant in selected["antecedents"]]
+    con_products = [sorted(con) for con in selected["consequents"]]
+
+    bulk = mba_fun.bulk_protential_customer_product(df=sample_transactions, ant_products=ant_products,
+                                                    con_products=con_products, just_customer_id=True)
+
+    # The customers of a rule are in customer order in the bulk output and in purchase order for a single rule -------:
+    per_rule = np.concatenate([
+        np.sort(mba_fun.get_protential_customer_product(df=sample_transactions, ant_products=ant, con_products=con,
+                                                        just_customer_id=True)["Customer_ID"].to_numpy())
+        for ant, con in zip(ant_products, con_products)
+    ])
+
+    assert np.array_equal(bulk["Customer_ID"].to_numpy(), per_rule)
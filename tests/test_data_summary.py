@@ -0,0 +1,20 @@
+import numpy as np
+import pytest
+
+import function as mba_fun
+
+INFO_TYPES = ["no_transaction", "no_unique_customers", "total_sales", "average_sales", "unique_products"]
+
+
+@pytest.mark.filterwarnings("ignore")
+@pytest.mark.parametrize("taxonomy", [False, True])
+def test_data_summary_matches_create_data_info(transactions, taxonomy):
+    df = transactions.copy()
+    df.loc[df.index[::50], "Sales_Amount"] = np.nan
+
+    if taxonomy:
+        df = mba_fun.lump_product_data(df=df, threshold=60)
+
+    summary = mba_fun.create_data_summary(df=df)
+
+    assert summary == {info_type: mba_fun.create_data_info(df=df, info_type=info_type) for info_type in INFO_TYPES}
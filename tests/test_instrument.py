@@ -0,0 +1,87 @@
+import tracemalloc
+
+import pytest
+
+import instrument
+
+
+@pytest.fixture
+def trace_memory(monkeypatch):
+    monkeypatch.setattr(instrument, "TRACE_MEMORY", True)
+    tracing = tracemalloc.is_tracing()
+
+    if not tracing:
+        tracemalloc.start()
+
+    yield
+
+    if not tracing:
+        tracemalloc.stop()
+
+
+def test_peak_includes_memory_freed_before_a_nested_stage(trace_memory):
+    @instrument.instrument(stage="test.inner")
+    def inner():
+        return 1
+
+    @instrument.instrument(stage="test.outer")
+    def outer():
+        block = bytearray(20_000_000)
+        del block
+        return inner()
+
+    outer()
+
+    assert instrument.stage_metrics["test.outer"]["peak_bytes"] >= 20_000_000
+    assert instrument.stage_metrics["test.inner"]["peak_bytes"] < 1_000_000
+
+
+def test_peak_includes_the_peak_of_a_nested_stage(trace_memory):
+    @instrument.instrument(stage="test.nested_inner")
+    def inner():
+        block = bytearray(20_000_000)
+        del block
+
+    @instrument.instrument(stage="test.nested_outer")
+    def outer():
+        inner()
+
+    outer()
+
+    assert instrument.stage_metrics["test.nested_outer"]["peak_bytes"] >= 20_000_000
+
+
+def test_callbacks_sharing_a_name_are_recorded_per_output():
+    import dash
+    from dash import Input, Output, html
+
+    app = dash.Dash(__name__)
+    app.layout = html.Div([html.Div(id="a"), html.Div(id="b"), html.Div(id="c")])
+    app.callback = instrument.instrument_callbacks(app.callback, app.callback_map)
+
+    @app.callback(Output("b", "children"), Input("a", "children"))
+    def copy_value(value):
+        return value
+
+    @app.callback(Output("c", "children"), Input("a", "children"))
+    def copy_value(value):  # noqa: F811
+        return value
+
+    client = app.server.test_client()
+
+    for output in ["b.children", "c.children"]:
+        client.post("/_dash-update-component", json={
+            "output": output, "outputs": {"id": output.split(".")[0], "property": "children"},
+            "inputs": [{"id": "a", "property": "children", "value": "x"}], "changedPropIds": ["a.children"],
+        })
+
+    assert instrument.stage_metrics["callback.b.children"]["calls"] == 1
+    assert instrument.stage_metrics["callback.c.children"]["calls"] == 1
+
+
+def test_metrics_escape_pattern_matching_outputs():
+    instrument.record_stage('callback.{"index":["MATCH"],"type":"server_table"}.data', 0.01)
+
+    escaped = 'callback.{\\"index\\":[\\"MATCH\\"],\\"type\\":\\"server_table\\"}.data'
+
+    assert f'mba_stage_calls_total{{stage="{escaped}"}} 1' in instrument.metrics_text()
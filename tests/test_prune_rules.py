@@ -0,0 +1,32 @@
+import pandas as pd
+
+import function as mba_fun
+
+
+def test_prune_redundant_rules_matches_pairwise_comparison(rules):
+    redundant = set()
+
+    # Compare every pair of rules with the same consequents -----------------------------------------------------------:
+    for _, group in rules.groupby(rules["consequents"].map(lambda x: tuple(sorted(x)))):
+        for i, ant, conf, lift in zip(group.index, group["antecedents"], group["confidence"], group["lift"]):
+            if any(sub_ant < ant and sub_conf >= conf and sub_lift >= lift
+                   for sub_ant, sub_conf, sub_lift in zip(group["antecedents"], group["confidence"], group["lift"])):
+                redundant.add(i)
+
+    pruned = mba_fun.prune_redundant_rules(df=rules)
+
+    assert 0 < len(redundant) < rules.shape[0]
+    pd.testing.assert_frame_equal(pruned, rules.drop(index=list(redundant)).reset_index(drop=True))
+
+
+def test_prune_keeps_a_rule_with_a_better_metric_than_its_sub_rule():
+    rules = pd.DataFrame({
+        "antecedents": [frozenset(["a"]), frozenset(["a", "b"]), frozenset(["a", "c"]), frozenset(["b"])],
+        "consequents": [frozenset(["x"]), frozenset(["x"]), frozenset(["x"]), frozenset(["y"])],
+        "confidence": [0.5, 0.4, 0.6, 0.9],
+        "lift": [2.0, 1.5, 1.5, 3.0],
+    })
+
+    pruned = mba_fun.prune_redundant_rules(df=rules)
+
+    assert pruned["antecedents"].to_list() == [frozenset(["a"]), frozenset(["a", "c"]), frozenset(["b"])]
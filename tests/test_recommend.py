@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+import function as mba_fun
+
+
+def brute_force_scores(transactions, rules, metric):
+    """
+    The best `metric` of every unpurchased consequent product of each customer, from every rule whose antecedents the
+    customer purchased, by a loop over the customers and the rules.
+    """
+    scores = {}
+
+    for customer, purchased in transactions.groupby("Customer_ID")["Product"].agg(set).items():
+        best = {}
+
+        for ant, con, score in zip(rules["antecedents"], rules["consequents"], rules[metric]):
+            if ant <= purchased:
+                for product in con - purchased:
+                    best[product] = max(best.get(product, -np.inf), score)
+
+        if best:
+            scores[customer] = best
+
+    return scores
+
+
+@pytest.mark.parametrize("metric", ["lift", "confidence"])
+@pytest.mark.parametrize("k", [1, 5])
+def test_recommend_products_matches_brute_force(sample_transactions, rules, metric, k):
+    expected = brute_force_scores(sample_transactions, rules, metric)
+    recommended = mba_fun.recommend_products(df=sample_transactions, rules=rules, k=k, metric=metric)
+
+    assert set(recommended["Customer_ID"]) == set(expected)
+
+    for customer, group in recommended.groupby("Customer_ID"):
+        best = expected[customer]
+        top_scores = sorted(best.values(), reverse=True)[:k]
+
+        # Products tied on the score may be ranked in any order, so the scores and each product's score are compared -:
+        assert group["Rank"].to_list() == list(range(1, len(top_scores) + 1))
+        assert group[metric.title()].to_numpy() == pytest.approx(top_scores)
+        assert all(best[product] == pytest.approx(score)
+                   for product, score in zip(group["Recommended_Product"], group[metric.title()]))
+
+
+@pytest.mark.parametrize("metric", ["lift", "confidence"])
+def test_recommend_basket_matches_brute_force(transactions, rules, metric):
+    basket_rules = mba_fun.compile_basket_rules(rules=rules)
+    baskets = transactions.groupby("Customer_ID")["Product"].agg(set).to_list()[:300]
+
+    for basket in baskets:
+        best = {}
+
+        for ant, con, score in zip(rules["antecedents"], rules["consequents"], rules[metric]):
+            if ant <= basket:
+                for product in con - basket:
+                    best[product] = max(best.get(product, -np.inf), score)
+
+        recommended = mba_fun.recommend_basket(basket_rules, list(basket), k=5, metric=metric)
+
+        assert [r[metric] for r in recommended] == pytest.approx(sorted(best.values(), reverse=True)[:5])
+        assert all(best[r["product"]] == pytest.approx(r[metric]) for r in recommended)
+        assert all(set(r["antecedents"]) <= basket for r in recommended)
@@ -0,0 +1,138 @@
+import operator
+
+import numpy as np
+import pytest
+
+import function as mba_fun
+
+COMPARISONS = {"<": operator.lt, ">": operator.gt, ">=": operator.ge, "<=": operator.le, "==": operator.eq,
+               "!=": operator.ne}
+
+
+def products_filter(df, search_type, f_rule_type, f_product_type, s_rule_type=None, s_product_type=None,
+                    bitwise_opt=None):
+    """
+    The product clause as a pandas mask, a rule matches 'any' when it shares a product and 'all' when it holds exactly
+    the products.
+    """
+
+    def match(rule_type, products):
+        products = frozenset([products] if isinstance(products, str) else products)
+
+        if search_type == "any":
+            return df[rule_type].map(lambda x: len(x & products) > 0)
+        else:
+            return df[rule_type] == products
+
+    mask = match(f_rule_type, f_product_type)
+
+    if bitwise_opt == "&":
+        mask = mask & match(s_rule_type, s_product_type)
+    elif bitwise_opt == "|":
+        mask = mask | match(s_rule_type, s_product_type)
+
+    return df.loc[mask]
+
+
+def metrics_filter(df, query_values, comp_op, bitw_op):
+    """
+    The metric clause as a pandas query string, as `filter_rules_values` built it before the compiled predicates.
+    """
+    terms = [f"(`{metric}` {comp} {value})" for (metric, value), comp in zip(query_values.items(), comp_op)]
+    query = terms[0] + "".join(f" {bitw} {term}" for bitw, term in zip(bitw_op, terms[1:]))
+
+    return df.query(query)
+
+
+def length_filter(df, rule_type, comp_op, length):
+    return df.loc[COMPARISONS[comp_op](df[rule_type].map(len), length)]
+
+
+PRODUCTS = [
+    {"search_type": "any", "f_rule_type": "antecedents", "f_product_type": ["margarine", "pasta"]},
+    {"search_type": "all", "f_rule_type": "consequents", "f_product_type": "berries"},
+    {"search_type": "any", "f_rule_type": "antecedents", "f_product_type": "spices", "s_rule_type": "consequents",
+     "s_product_type": ["margarine", "butter"], "bitwise_opt": "|"},
+    {"search_type": "any", "f_rule_type": "antecedents", "f_product_type": "spices", "s_rule_type": "consequents",
+     "s_product_type": ["margarine", "butter"], "bitwise_opt": "&"},
+]
+
+METRICS = [
+    {"query_values": {"lift": 1.2}, "comp_op": [">="], "bitw_op": []},
+    {"query_values": {"confidence": 0.1, "support": 0.006}, "comp_op": [">", "<="], "bitw_op": ["&"]},
+    {"query_values": {"lift": 2, "confidence": 0.3, "leverage": 0}, "comp_op": [">", ">", "<"], "bitw_op": ["|", "&"]},
+]
+
+LENGTHS = [
+    {"rule_type": "antecedents", "comp_op": ">=", "length": 2},
+    {"rule_type": "consequents", "comp_op": "==", "length": 1},
+]
+
+
+@pytest.fixture(scope="module")
+def rule_artifacts(rules):
+    return {"product_index": mba_fun.create_product_index(df=rules),
+            "metric_ranges": mba_fun.rule_metric_ranges(df=rules),
+            "metric_index": mba_fun.create_metric_index(df=rules),
+            "rule_lengths": mba_fun.create_rule_lengths(df=rules)}
+
+
+@pytest.mark.parametrize("products", PRODUCTS + [None])
+@pytest.mark.parametrize("metrics", METRICS + [None])
+@pytest.mark.parametrize("length", LENGTHS + [None])
+def test_rule_query_matches_chained_filters(rules, rule_artifacts, products, metrics, length):
+    if products is None and metrics is None and length is None:
+        pytest.skip("a rule query needs a clause")
+
+    expected = rules
+
+    if products is not None:
+        expected = products_filter(expected, **products)
+    if metrics is not None:
+        expected = metrics_filter(expected, **metrics)
+    if length is not None:
+        expected = length_filter(expected, **length)
+
+    rule_query = mba_fun.create_rule_query(products=products, metrics=metrics, length=length)
+
+    assert np.array_equal(mba_fun.rule_query_ids(rules, rule_query, **rule_artifacts), expected.index.to_numpy())
+    assert np.array_equal(mba_fun.rule_query_ids(rules, rule_query), expected.index.to_numpy())
+
+
+@pytest.mark.parametrize("products", PRODUCTS)
+def test_product_filter_matches_pandas(rules, rule_artifacts, products):
+    filtered = mba_fun.filter_products_contain(rules, product_index=rule_artifacts["product_index"], **products)
+
+    assert np.array_equal(filtered.index.to_numpy(), products_filter(rules, **products).index.to_numpy())
+
+
+@pytest.mark.parametrize("how", ["any", "all", "equal"])
+def test_no_products_match_no_rules(rule_artifacts, how):
+    assert mba_fun.match_product_index(rule_artifacts["product_index"], "antecedents", [], how=how).size == 0
+
+
+@pytest.mark.parametrize("search_type", ["any", "all"])
+def test_product_filter_without_products_matches_pandas(rules, rule_artifacts, search_type):
+    products = {"search_type": search_type, "f_rule_type": "antecedents", "f_product_type": []}
+    filtered = mba_fun.filter_products_contain(rules, product_index=rule_artifacts["product_index"], **products)
+
+    assert np.array_equal(filtered.index.to_numpy(), products_filter(rules, **products).index.to_numpy())
+
+
+@pytest.mark.parametrize("metrics", METRICS)
+def test_metric_filter_matches_a_pandas_query(rules, rule_artifacts, metrics):
+    expected = metrics_filter(rules, **metrics).index.to_numpy()
+
+    assert np.array_equal(mba_fun.filter_rules_values(rules, **metrics).index.to_numpy(), expected)
+    assert np.array_equal(mba_fun.filter_rules_values(rules, metric_index=rule_artifacts["metric_index"],
+                                                      **metrics).index.to_numpy(), expected)
+
+
+def test_rule_query_searches_only_the_supplied_rules(rules, rule_artifacts):
+    narrow = mba_fun.create_rule_query(metrics=METRICS[0])
+    wide = mba_fun.create_rule_query(metrics=METRICS[0], length=LENGTHS[0])
+
+    rule_ids = mba_fun.rule_query_ids(rules, narrow, **rule_artifacts)
+
+    assert np.array_equal(mba_fun.rule_query_ids(rules, wide, rule_ids=rule_ids, **rule_artifacts),
+                          mba_fun.rule_query_ids(rules, wide, **rule_artifacts))
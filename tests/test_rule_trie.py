@@ -0,0 +1,42 @@
+import pytest
+
+import function as mba_fun
+
+
+@pytest.fixture(scope="module")
+def antecedents(rules):
+    return list(rules["antecedents"].drop_duplicates())
+
+
+def test_match_rule_trie_matches_brute_force(transactions, antecedents):
+    rule_trie = mba_fun.create_rule_trie(antecedents)
+    baskets = transactions.groupby("Customer_ID")["Product"].agg(set).to_list()[:2_000]
+    baskets += [set(), {"not a product"}, {"not a product", *antecedents[0]}]
+
+    for basket in baskets:
+        expected = [i for i, ant in enumerate(antecedents) if ant <= basket]
+        assert sorted(mba_fun.match_rule_trie(rule_trie, list(basket))) == expected
+
+
+def test_match_rule_trie_accepts_string_antecedents_and_products():
+    rule_trie = mba_fun.create_rule_trie(["milk", ["bread", "milk"], ["bread", "eggs", "milk"]])
+
+    assert sorted(mba_fun.match_rule_trie(rule_trie, "milk")) == [0]
+    assert sorted(mba_fun.match_rule_trie(rule_trie, ["milk", "bread", "jam"])) == [0, 1]
+    assert mba_fun.match_rule_trie(rule_trie, ["bread", "eggs"]) == []
+
+
+def test_match_rule_trie_rows_matches_brute_force(sample_transactions, antecedents):
+    rule_trie = mba_fun.create_rule_trie(antecedents)
+    customer_items = mba_fun.create_customer_items(df=sample_transactions)
+
+    customers, ant_ids = mba_fun.match_rule_trie_rows(rule_trie, *mba_fun.customer_trie_items(customer_items,
+                                                                                               rule_trie))
+
+    baskets = sample_transactions.groupby("Customer_ID")["Product"].agg(set)
+    baskets = baskets.loc[customer_items["customers"]].to_list()
+
+    expected = {(c, i) for c, basket in enumerate(baskets) for i, ant in enumerate(antecedents) if ant <= basket}
+
+    assert len(customers) == len(expected)
+    assert set(zip(customers.tolist(), ant_ids.tolist())) == expected
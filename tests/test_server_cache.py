@@ -0,0 +1,29 @@
+import pandas as pd
+
+import server_cache
+
+
+def test_sorted_pages_do_not_evict_results():
+    df = pd.DataFrame({"product": [f"p{i:03d}" for i in range(100)][::-1], "lift": range(100)})
+    handles = [server_cache.store_result(df) for _ in range(4)]
+
+    for handle in handles:
+        for page in range(server_cache.sort_cache.maxsize):
+            for direction in ["asc", "desc"]:
+                server_cache.result_page(handle, page % 10, 10, [{"column_id": "product", "direction": direction}])
+
+    assert all(server_cache.result_page(handle, 0, 10) is not None for handle in handles)
+
+    page = server_cache.result_page(handles[0], 1, 10, [{"column_id": "product", "direction": "asc"}])
+    assert page["product"].to_list() == [f"p{i:03d}" for i in range(10, 20)]
+
+
+def test_evicted_results_drop_their_sorted_pages():
+    handle = server_cache.store_result(pd.DataFrame({"product": ["b", "a"]}))
+    server_cache.result_page(handle, 0, 10, [{"column_id": "product", "direction": "asc"}])
+
+    for _ in range(server_cache.result_cache.maxsize):
+        server_cache.store_result(pd.DataFrame({"product": ["c"]}))
+
+    assert server_cache.result_page(handle, 0, 10) is None
+    assert (handle, "product", True) not in server_cache.sort_cache
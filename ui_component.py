@@ -2,8 +2,12 @@ from dash import dcc, html, dash_table, ctx
 import dash_bootstrap_components as dbc
 from dash.dash_table.Format import Format, Scheme, Group
 from string import punctuation
+from math import ceil
 
-from pandas.api.types import is_numeric_dtype
+from instrument import instrument
+from lazy_module import LazyModule
+
+pandas_types = LazyModule("pandas.api.types")
 
 # App colors ----------------------------------------------------------------------------------------------------------:
 seq_selected_color = "#7FFFD4"
@@ -220,9 +224,11 @@ def disable_fs_rule_type(opt1, opt2=None, typ="single"):
 
 def create_description_table(m_dict, return_type, return_name):
     # return_name >> Analysis | Filtered Data
+    pruned = f" {m_dict['n_pruned']:,} redundant rules were removed." if m_dict.get("n_pruned") is not None else ""
+
     if return_type == "rules":
         return f"""
-         {return_name} returned **{m_dict['n_rules']:,}** rules.      
+         {return_name} returned **{m_dict['n_rules']:,}** rules.{pruned}      
 
         | Metric | Minimum | Maximum |
         | --- | --- | --- |
@@ -257,10 +263,38 @@ def clean_column_names(df):
     return df
 
 
+@instrument()
 def create_dataframe(df, page_size=10, align_text="left", precision=2, increase_col_width=None, tbl_height=None,
-                     tbl_width=None, change_tbl_color=None):
+                     tbl_width=None, change_tbl_color=None, result_handle=None, file_name="result", rule_set_key=None,
+                     sort_by=None, page_data=None):
+    """
+    :parameter
+    result_handle [string] The handle of `df` in the server side result cache. When supplied only the first page is
+                  sent to the browser, paging and sorting are done by the server and the full result can be
+                  downloaded as CSV or Parquet, streamed by the server.
+    file_name [string] The name of the downloaded file, without the extension.
+    rule_set_key [string] The key of the rule set `df` displays. When supplied with `result_handle` the rule set can
+                 also be downloaded as the JSON rule table read by batch_score.py.
+    sort_by [list] The DataTable `sort_by` of the first page of a server table.
+    page_data [dataframe] The rows of the first page of a server table, by default the first `page_size` rows of
+              `df`.
+    """
     d_tbl = clean_column_names(df)
 
+    if result_handle is not None:
+        table_data = {
+            "id": {"type": "server_table", "index": result_handle},
+            "data": (d_tbl.iloc[0:page_size] if page_data is None else page_data).to_dict("records"),
+            "page_current": 0,
+            "page_count": max(1, ceil(d_tbl.shape[0] / page_size)),
+            "page_action": "custom",
+            "sort_action": "custom",
+            "sort_mode": "single",
+            "sort_by": sort_by or [],
+        }
+    else:
+        table_data = {"data": d_tbl.to_dict("records")}
+
     if increase_col_width is not None:
         cell_conditional = [{"if": {"column_id": increase_col_width[0]}, "width": increase_col_width[1]}]
     else:
@@ -295,10 +329,33 @@ def create_dataframe(df, page_size=10, align_text="left", precision=2, increase_
              "border-right": "#FFFFFF"},
         ]
 
+    if result_handle is not None:
+        links = [(output_format, f"/api/results/{result_handle}.{output_format.lower()}",
+                  f"{file_name}.{output_format.lower()}") for output_format in ["CSV", "Parquet"]]
+
+        if rule_set_key is not None:
+            links.append(("Rule Set", f"/api/rule-sets/{rule_set_key}.json", f"{file_name}.json"))
+
+        download_links = [
+            html.Div(
+                [
+                    html.Div(id={"type": "server_table_message", "index": result_handle},
+                             className="text-danger small me-auto"),
+                ] + [
+                    html.A([html.I(className="bi bi-download me-1"), name], href=href, download=download,
+                           className="btn btn-outline-primary btn-sm ms-2")
+                    for name, href, download in links
+                ],
+                className="d-flex justify-content-end mb-2",
+            )
+        ]
+    else:
+        download_links = []
+
     return html.Div(
-        [
+        download_links + [
             dash_table.DataTable(
-                data=d_tbl.to_dict("records"),
+                **table_data,
                 columns=[
                     {"name": col, "id": col,
                      "format": Format(nully="N/A",
@@ -306,8 +363,8 @@ def create_dataframe(df, page_size=10, align_text="left", precision=2, increase_
                                       scheme=Scheme.fixed,
                                       group=Group.yes,
                                       groups=3,
-                                      ), "type": "numeric" if is_numeric_dtype(d_tbl[col]) else None} for col in
-                    d_tbl.columns
+                                      ),
+                     "type": "numeric" if pandas_types.is_numeric_dtype(d_tbl[col]) else None} for col in d_tbl.columns
                 ],
                 # {"specifier": ".2f"},
                 page_size=page_size,
@@ -334,10 +391,12 @@ def create_dataframe(df, page_size=10, align_text="left", precision=2, increase_
 # {"if": {"row_index": "even"}, "backgroundColor": "#FAFAFA", "color": "#000000"},
 
 
-def create_graph(graph_object):
+def create_graph(graph_object, graph_id=None):
+    graph_id = {} if graph_id is None else {"id": graph_id}
     return html.Div(
         [
-            dcc.Graph(figure=graph_object,
+            dcc.Graph(**graph_id,
+                      figure=graph_object,
                       config={
                           "displaylogo": False,
                           "modeBarButtonsToRemove": ["pan2d", "lasso2d", "zoomIn2d", "zoomOut2d", "zoom2d", "toImage",
@@ -504,6 +563,8 @@ def filter_div(id_type):  # type = 'jq', 'gl'
                                 delay={"hide": 100}
                             ),
 
+                            html.Small(id=f"{id_type}_length_count", className="text-muted"),
+
                             html.Br(),
 
                             filter_dbc_button(id=f"{id_type}_filter_rule_rule_length"),
@@ -514,6 +575,26 @@ def filter_div(id_type):  # type = 'jq', 'gl'
                 ],
                 start_collapsed=True
             ),
+
+            dbc.Checklist(
+                id=f"{id_type}_combine_filters",
+                options=[{"label": "Combine all filters", "value": "combine"}],
+                value=[],
+                switch=True,
+                input_class_name="dash-control-bc",
+                class_name="text-start mt-2",
+                persistence=True,
+                persistence_type="memory",
+            ),
+
+            dbc.Tooltip(
+                """
+                When on, every filter button returns the rules that meet all the completed filters.
+                """,
+                target=f"{id_type}_combine_filters",
+                placement="bottom",
+                delay={"hide": 100}
+            ),
         ]
     )
 